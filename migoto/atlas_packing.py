@@ -0,0 +1,159 @@
+"""
+XXMI Tools CHN — 贴图图集矩形装箱
+==========================================
+纯 Python 实现，不依赖 bpy：
+- skyline_pack: 天际线 (Skyline Bottom-Left) 装箱
+- maxrects_pack: MaxRects 装箱，支持 BSSF (Best Short Side Fit) 与 BL (Bottom-Left)
+
+输入矩形统一为 [(key, w, h), ...]，不旋转；
+返回 ({key: (x, y)}, 实际使用高度)，放不下时返回 None。
+"""
+
+
+def _sort_rects(rects):
+    """按高度、宽度降序排列，大块优先放置"""
+    return sorted(rects, key=lambda r: (r[2], r[1]), reverse=True)
+
+
+# ============================================================
+# Skyline
+# ============================================================
+
+def skyline_pack(rects, width, height=None):
+    """天际线装箱：每次选择放置后顶边最低（其次最靠左）的位置"""
+    limit = height if height is not None else float('inf')
+    # 天际线段 [x, y, w]，按 x 升序且首尾相接
+    skyline = [[0, 0, width]]
+    placements = {}
+    used_h = 0
+
+    for key, w, h in _sort_rects(rects):
+        if w > width:
+            return None
+        best = None  # (top, x, 起始段索引, y)
+        for i in range(len(skyline)):
+            x = skyline[i][0]
+            if x + w > width:
+                break
+            # 矩形跨越的所有段中最高的 y 即为放置高度
+            y = 0
+            remaining = w
+            j = i
+            while remaining > 0:
+                y = max(y, skyline[j][1])
+                remaining -= skyline[j][2]
+                j += 1
+            if y + h > limit:
+                continue
+            if best is None or (y + h, x) < best[:2]:
+                best = (y + h, x, i, y)
+        if best is None:
+            return None
+
+        top, x, i, y = best
+        placements[key] = (x, y)
+        used_h = max(used_h, top)
+
+        # 用新段覆盖 [x, x+w)，截断被部分覆盖的后续段
+        new_seg = [x, top, w]
+        j = i
+        end = x + w
+        while j < len(skyline) and skyline[j][0] < end:
+            seg_end = skyline[j][0] + skyline[j][2]
+            if seg_end > end:
+                skyline[j] = [end, skyline[j][1], seg_end - end]
+                break
+            j += 1
+        skyline[i:j] = [new_seg]
+
+        # 合并相同高度的相邻段
+        merged = [skyline[0]]
+        for seg in skyline[1:]:
+            if seg[1] == merged[-1][1]:
+                merged[-1] = [merged[-1][0], merged[-1][1], merged[-1][2] + seg[2]]
+            else:
+                merged.append(seg)
+        skyline = merged
+
+    return placements, used_h
+
+
+# ============================================================
+# MaxRects
+# ============================================================
+
+def _split_free_rect(free, used):
+    """将与 used 相交的空闲矩形拆分为最多 4 个不相交的最大子矩形"""
+    fx, fy, fw, fh = free
+    ux, uy, uw, uh = used
+    if ux >= fx + fw or ux + uw <= fx or uy >= fy + fh or uy + uh <= fy:
+        return [free]
+    result = []
+    if ux > fx:
+        result.append((fx, fy, ux - fx, fh))
+    if ux + uw < fx + fw:
+        result.append((ux + uw, fy, fx + fw - ux - uw, fh))
+    if uy > fy:
+        result.append((fx, fy, fw, uy - fy))
+    if uy + uh < fy + fh:
+        result.append((fx, uy + uh, fw, fy + fh - uy - uh))
+    return result
+
+
+def _prune_free_rects(free_rects):
+    """去掉被其他空闲矩形完全包含的矩形"""
+    pruned = []
+    for i, a in enumerate(free_rects):
+        contained = False
+        for j, b in enumerate(free_rects):
+            if i == j:
+                continue
+            if (a[0] >= b[0] and a[1] >= b[1]
+                    and a[0] + a[2] <= b[0] + b[2] and a[1] + a[3] <= b[1] + b[3]):
+                # 完全相同的矩形只保留索引较小的一个
+                if a != b or i > j:
+                    contained = True
+                    break
+        if not contained:
+            pruned.append(a)
+    return pruned
+
+
+def maxrects_pack(rects, width, height=None, heuristic='BSSF'):
+    """
+    MaxRects 装箱。
+    height 为 None 时视为高度不限，此时建议使用 'BL' 以压低整体高度；
+    固定尺寸的图集使用 'BSSF'（短边剩余最小优先）。
+    """
+    sorted_rects = _sort_rects(rects)
+    if height is None:
+        height = sum(h for _, _, h in sorted_rects)
+    free_rects = [(0, 0, width, height)]
+    placements = {}
+    used_h = 0
+
+    for key, w, h in sorted_rects:
+        best = None  # (score, free_rect)
+        for fx, fy, fw, fh in free_rects:
+            if w > fw or h > fh:
+                continue
+            if heuristic == 'BSSF':
+                leftover_w, leftover_h = fw - w, fh - h
+                score = (min(leftover_w, leftover_h), max(leftover_w, leftover_h), fy, fx)
+            else:
+                score = (fy + h, fx)
+            if best is None or score < best[0]:
+                best = (score, (fx, fy))
+        if best is None:
+            return None
+
+        x, y = best[1]
+        placements[key] = (x, y)
+        used_h = max(used_h, y + h)
+        used = (x, y, w, h)
+        split = []
+        for free in free_rects:
+            split.extend(_split_free_rect(free, used))
+        free_rects = _prune_free_rects(split)
+
+    return placements, used_h
@@ -1,9 +1,12 @@
 import bpy
 import numpy as np
 from mathutils import Vector, Matrix
+from mathutils.kdtree import KDTree
 from bpy.types import Operator, PropertyGroup, Panel
 from bpy.props import EnumProperty, FloatProperty, BoolProperty, PointerProperty
 
+from . import vertex_weights
+
 # =============================================================================
 # 1. 核心算法
 # =============================================================================
@@ -15,27 +18,37 @@ def _vgroup_items(self, context):
         return [(vg.name, vg.name, "") for vg in obj.vertex_groups]
     return [("","(无顶点组)","")]
 
+def _vertex_coords_in_arm_space(mesh_obj, arm_obj):
+    """一次 foreach_get 读取全部顶点并变换到骨架空间"""
+    mesh = mesh_obj.data
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co = co.reshape(-1, 3).astype(np.float64)
+    m = np.array(arm_obj.matrix_world.inverted() @ mesh_obj.matrix_world, dtype=np.float64)
+    return co @ m[:3, :3].T + m[:3, 3]
+
+def get_all_coords_and_weights_in_arm_space(mesh_obj, arm_obj, w_thresh=0.001):
+    """
+    从共享的 CSR 权重矩阵一次取出所有顶点组的 (坐标, 权重)。
+    返回按顶点组索引排列的列表，权重均不超过阈值的组为 (None, None)。
+    """
+    coords = _vertex_coords_in_arm_space(mesh_obj, arm_obj)
+    result = []
+    for vertex_ids, weights in vertex_weights.extract_vertex_weights(mesh_obj).split_by_group():
+        keep = weights > w_thresh
+        if not keep.any():
+            result.append((None, None))
+            continue
+        result.append((coords[vertex_ids[keep]], weights[keep].astype(np.float64)))
+    return result
+
 def get_coords_and_weights_in_arm_space(mesh_obj, arm_obj, vg, w_thresh=0.001):
-    arm_inv = arm_obj.matrix_world.inverted()
-    coords = []
-    weights = []
-    gi = vg.index
-
-    for v in mesh_obj.data.vertices:
-        w = 0.0
-        for g in v.groups:
-            if g.group == gi:
-                w = g.weight
-                break
-        if w > w_thresh:
-            world_co = mesh_obj.matrix_world @ v.co
-            local_co = arm_inv @ world_co
-            coords.append((local_co.x, local_co.y, local_co.z))
-            weights.append(w)
-
-    if not coords:
+    weights = vertex_weights.extract_vertex_weights(mesh_obj).column(vg.index)
+    vertex_ids = np.flatnonzero(weights > w_thresh)
+    if len(vertex_ids) == 0:
         return None, None
-    return np.asarray(coords, dtype=np.float64), np.asarray(weights, dtype=np.float64)
+    coords = _vertex_coords_in_arm_space(mesh_obj, arm_obj)
+    return coords[vertex_ids], weights[vertex_ids].astype(np.float64)
 
 def weighted_mean(coords, weights):
     W = weights.sum()
@@ -49,27 +62,26 @@ def weighted_cov(coords, weights, mean):
     if W == 0:
         return np.cov(X.T)
     
-    S = np.zeros((3,3), dtype=np.float64)
-    for i in range(X.shape[0]):
-        xi = X[i:i+1].T
-        S += weights[i] * (xi @ xi.T)
-    S /= W
-    return S
+    return (X * weights[:, None]).T @ X / W
 
-def weighted_quantile(values, weights, q):
+def weighted_quantiles(values, weights, qs):
+    """一次排序求多个加权分位数"""
+    qs = np.asarray(qs, dtype=np.float64)
     if len(values) == 0:
-        return 0.0
+        return np.zeros(len(qs))
     order = np.argsort(values)
     v = values[order]
     w = weights[order]
     cw = np.cumsum(w)
     if cw[-1] == 0:
-        return v[int(q*len(v))]
-    t = q * cw[-1]
-    idx = np.searchsorted(cw, t, side='left')
+        return v[(qs * len(v)).astype(np.int64)]
+    idx = np.searchsorted(cw, qs * cw[-1], side='left')
     idx = np.clip(idx, 0, len(v)-1)
     return v[idx]
 
+def weighted_quantile(values, weights, q):
+    return weighted_quantiles(values, weights, [q])[0]
+
 def detect_ring_like(eigvals, tol=1.2):
     ratios = [
         eigvals[0] / max(eigvals[1], 1e-12),
@@ -111,8 +123,7 @@ def pca_fit(coords, weights, low_q=0.05, high_q=0.95):
     axis /= np.linalg.norm(axis) + 1e-12
 
     proj = (coords - center) @ axis
-    pmin = weighted_quantile(proj, weights, low_q)
-    pmax = weighted_quantile(proj, weights, high_q)
+    pmin, pmax = weighted_quantiles(proj, weights, [low_q, high_q])
     if pmax - pmin < 1e-6:
         pmin, pmax = -0.01, 0.01
 
@@ -169,9 +180,9 @@ def build_armature_from_all_vgroups(mesh_obj, connect_factor=0.0, w_thresh=0.001
 
     ensure_edit_mode(arm_obj)
 
-    # 1. 批量生成
-    for vg in mesh_obj.vertex_groups:
-        coords, weights = get_coords_and_weights_in_arm_space(mesh_obj, arm_obj, vg, w_thresh)
+    # 1. 批量生成：一次取出所有顶点组的坐标与权重
+    all_data = get_all_coords_and_weights_in_arm_space(mesh_obj, arm_obj, w_thresh)
+    for vg, (coords, weights) in zip(mesh_obj.vertex_groups, all_data):
         if coords is None:
             continue
         head, tail, length, axis, case = pca_fit(coords, weights, low_q, high_q)
@@ -191,20 +202,19 @@ def build_armature_from_all_vgroups(mesh_obj, connect_factor=0.0, w_thresh=0.001
         thresh = float(avg_len * connect_factor)
 
         name_to_bone = {b.name: b for b in arm_obj.data.edit_bones}
+
+        # KD 树索引所有骨骼尾部，只在阈值范围内查找父骨骼候选
+        tails = KDTree(len(bones_info))
+        for i, o in enumerate(bones_info):
+            tails.insert(o["tail"], i)
+        tails.balance()
         
-        for b in bones_info:
+        for i, b in enumerate(bones_info):
             child = name_to_bone[b["name"]]
             if child.parent:
                 continue
-            best_parent = None
-            best_dist = 1e18
-            for o in bones_info:
-                if o["name"] == b["name"]:
-                    continue
-                parent = name_to_bone[o["name"]]
-                d = (b["head"] - o["tail"]).length
-                if d < thresh and d < best_dist:
-                    best_parent, best_dist = parent, d
+            candidates = [(d, j) for _, j, d in tails.find_range(b["head"], thresh) if j != i and d < thresh]
+            best_parent = name_to_bone[bones_info[min(candidates)[1]]["name"]] if candidates else None
             if best_parent:
                 child.parent = best_parent
                 child.use_connect = True
@@ -402,22 +412,8 @@ class XXMI_OT_RemoveEmptyVGroups(Operator):
             self.report({'ERROR'}, "请选择一个网格")
             return {'CANCELLED'}
 
-        removed = 0
-        for vg in list(obj.vertex_groups):
-            # 检查是否所有顶点在这个组的权重都是 0
-            # 优化逻辑：只要有一个顶点权重 > 0 就保留
-            is_empty = True
-            for v in obj.data.vertices:
-                for g in v.groups:
-                    if g.group == vg.index and g.weight > 0.0:
-                        is_empty = False
-                        break
-                if not is_empty:
-                    break
-            
-            if is_empty:
-                obj.vertex_groups.remove(vg)
-                removed += 1
+        # 只要有一个顶点权重 > 0 就保留：权重矩阵按列取最大值一次判断
+        removed = vertex_weights.remove_unused_vertex_groups(obj)
 
         self.report({'INFO'}, f"已移除 {removed} 个空顶点组")
         return {'FINISHED'}
@@ -1,9 +1,12 @@
 import collections
 import copy
+import hashlib
 import numpy
 from numpy.typing import NDArray, DTypeLike
 import time
+import bpy
 from bpy.types import Mesh, Object
+from pathlib import Path
 
 from typing import Optional, Callable
 
@@ -17,6 +20,77 @@ from .byte_buffer import (
 from .dxgi_format import DXGIFormat, DXGIType
 
 
+class TangentCache:
+    """Session cache of MikkTSpace results keyed by a fingerprint of their inputs.
+
+    Entries are (loops, 4) float32 arrays holding tangent xyz and bitangent sign.
+    When `cache_dir` is set, entries are also mirrored to disk as .npy files.
+    """
+
+    uv_layer_name: str = "TEXCOORD.xy"
+
+    def __init__(self, max_entries: int = 32) -> None:
+        self.max_entries: int = max_entries
+        self.cache_dir: Optional[Path] = None
+        self.entries: collections.OrderedDict[str, NDArray] = (
+            collections.OrderedDict()
+        )
+
+    def make_key(self, mesh: Mesh) -> str:
+        """Hash positions, loop normals, the tangent UV layer and loop topology."""
+        digest = hashlib.blake2b(digest_size=16)
+        coords = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float32)
+        mesh.vertices.foreach_get("co", coords)
+        digest.update(coords.tobytes())
+        loop_count: int = len(mesh.loops)
+        normals = numpy.empty(loop_count * 3, dtype=numpy.float32)
+        mesh.loops.foreach_get("normal", normals)
+        digest.update(normals.tobytes())
+        uvs = numpy.empty(loop_count * 2, dtype=numpy.float32)
+        mesh.uv_layers[self.uv_layer_name].data.foreach_get("uv", uvs)
+        digest.update(uvs.tobytes())
+        vertex_ids = numpy.empty(loop_count, dtype=numpy.int32)
+        mesh.loops.foreach_get("vertex_index", vertex_ids)
+        digest.update(vertex_ids.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[NDArray]:
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+            return data
+        if self.cache_dir is None:
+            return None
+        cache_file: Path = self.cache_dir / f"{key}.npy"
+        if not cache_file.is_file():
+            return None
+        try:
+            data = numpy.load(cache_file, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        self.store(key, data)
+        return data
+
+    def put(self, key: str, data: NDArray) -> None:
+        self.store(key, data)
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            numpy.save(self.cache_dir / f"{key}.npy", data)
+        except OSError as e:
+            print(f"Failed to write tangent cache: {e}")
+
+    def store(self, key: str, data: NDArray) -> None:
+        self.entries[key] = data
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
 class BlenderDataExtractor:
     blender_data_formats: dict[Semantic, DXGIFormat]
     blender_loop_semantics: list[Semantic] = [
@@ -35,6 +109,8 @@ class BlenderDataExtractor:
     ]
     format_converters: dict[AbstractSemantic, list[Callable]] = {}
     semantic_converters: dict[AbstractSemantic, list[Callable]] = {}
+    # Shared by every extractor for the whole Blender session
+    tangent_cache: TangentCache = TangentCache()
 
     def get_data(
         self,
@@ -45,6 +121,8 @@ class BlenderDataExtractor:
         format_converters: dict[AbstractSemantic, list[Callable]],
         vertex_ids_cache: Optional[NDArray] = None,
         flip_winding=False,
+        masked_vgs: Optional[NDArray] = None,
+        vg_remap: Optional[NDArray] = None,
     ) -> tuple[Optional[NDArray], NumpyBuffer]:
         self.blender_data_formats = blender_data_formats
 
@@ -78,7 +156,7 @@ class BlenderDataExtractor:
             print("Skipped loop data fetching!")
 
         # Extract requested data from blender vertices
-        vertex_data = self.get_vertex_data(mesh, proxy_layout)
+        vertex_data = self.get_vertex_data(mesh, proxy_layout, masked_vgs, vg_remap)
 
         if vertex_data is not None:
             # Output vb is based on actual faces we're going to draw, so we need to make vertex_data match the loop_data
@@ -254,8 +332,9 @@ class BlenderDataExtractor:
             s.abstract.enum in (Semantic.Tangent, Semantic.BitangentSign)
             for s in proxy_layout.semantics
         )
+        tangents: Optional[NDArray] = None
         if needs_tangents:
-            mesh.calc_tangents(uvmap="TEXCOORD.xy")
+            tangents = self.get_tangents(mesh)
 
         # Fetch loop data in polygon order (len(mesh.loops) entries).
         # We will reorder to triangle order afterwards with a single numpy
@@ -273,9 +352,11 @@ class BlenderDataExtractor:
             elif semantic == Semantic.Normal:
                 data = self.fetch_data(mesh.loops, "normal", numpy_type, poly_size)
             elif semantic == Semantic.Tangent:
-                data = self.fetch_data(mesh.loops, "tangent", numpy_type, poly_size)
+                data = numpy.empty(poly_size, dtype=numpy_type)
+                data[:] = tangents[:, 0:3]
             elif semantic == Semantic.BitangentSign:
-                data = self.fetch_data(mesh.loops, "bitangent_sign", numpy_type, poly_size)
+                data = numpy.empty(poly_size, dtype=numpy_type)
+                data[:] = tangents[:, 3]
             elif semantic == Semantic.Color:
                 data = self.fetch_data(
                     mesh.vertex_colors[semantic_name].data, "color", numpy_type, poly_size
@@ -325,7 +406,43 @@ class BlenderDataExtractor:
 
         return loop_data, index_data
 
-    def get_vertex_data(self, mesh: Mesh, proxy_layout: BufferLayout) -> NumpyBuffer:
+    def get_tangents(self, mesh: Mesh) -> NDArray:
+        """Returns (loops, 4) tangent + bitangent sign, reusing cached MikkTSpace results."""
+        start_time: float = time.time()
+        cache: TangentCache = self.tangent_cache
+        if cache.uv_layer_name not in mesh.uv_layers:
+            # Let calc_tangents raise the usual error about the missing UV map
+            mesh.calc_tangents(uvmap=cache.uv_layer_name)
+        if bpy.app.version < (4, 1):
+            # Loop normals are only filled in by calc_normals_split() before 4.1,
+            # and both the cache key and the exported NORMAL read them
+            mesh.calc_normals_split()
+        key: str = cache.make_key(mesh)
+        tangents: Optional[NDArray] = cache.get(key)
+        if tangents is not None and len(tangents) == len(mesh.loops):
+            print(f"Tangents cache hit: {time.time() - start_time:.3f}s")
+            return tangents
+        mesh.calc_tangents(uvmap=cache.uv_layer_name)
+        loop_count: int = len(mesh.loops)
+        tangents = numpy.empty((loop_count, 4), dtype=numpy.float32)
+        tangents[:, 0:3] = self.fetch_data(
+            mesh.loops, "tangent", (numpy.float32, 3), loop_count
+        )
+        tangents[:, 3] = self.fetch_data(
+            mesh.loops, "bitangent_sign", numpy.float32, loop_count
+        )
+        self.sanitize_blender_data(tangents)
+        cache.put(key, tangents)
+        print(f"Tangents calc time: {time.time() - start_time:.3f}s")
+        return tangents
+
+    def get_vertex_data(
+        self,
+        mesh: Mesh,
+        proxy_layout: BufferLayout,
+        masked_vgs: Optional[NDArray] = None,
+        vg_remap: Optional[NDArray] = None,
+    ) -> NumpyBuffer:
         start_time = time.time()
 
         # Make vertex data layout
@@ -367,6 +484,12 @@ class BlenderDataExtractor:
                 _blend_vi = numpy.asarray(vi_list, dtype=numpy.int32)
                 _blend_gi = numpy.asarray(gi_list, dtype=numpy.int32)
                 _blend_wt = numpy.asarray(wt_list, dtype=numpy.float32)
+                # MASK groups keep their slot but export with zero weight
+                if masked_vgs is not None and len(masked_vgs) > 0:
+                    _blend_wt[numpy.isin(_blend_gi, masked_vgs)] = 0.0
+                # Virtual vertex group reorder: old group index -> exported index
+                if vg_remap is not None:
+                    _blend_gi = vg_remap[_blend_gi]
                 # Sort by vertex id (asc) then by weight (desc) with one C-level sort
                 order = numpy.lexsort((-_blend_wt, _blend_vi))
                 _blend_vi = _blend_vi[order]
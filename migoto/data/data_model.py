@@ -1,4 +1,5 @@
 import time
+import functools
 from typing import Callable, Optional, Union
 import copy
 import numpy
@@ -143,10 +144,21 @@ class DataModel(object):
         mesh: Mesh,
         excluded_buffers: list[str],
         mirror_mesh: bool = False,
+        fill_vertex_groups: bool = False,
     ) -> tuple[dict[str, NumpyBuffer], int]:
+        masked_vgs: NDArray = self.get_masked_vertex_groups(obj)
+        vg_remap: Optional[NDArray] = (
+            self.get_vertex_group_fill_remap(obj) if fill_vertex_groups else None
+        )
         try:
             index_data, vertex_buffer = self.export_data(
-                context, collection, mesh, excluded_buffers, mirror_mesh
+                context,
+                collection,
+                mesh,
+                excluded_buffers,
+                mirror_mesh,
+                masked_vgs,
+                vg_remap,
             )
         except RuntimeError:
             raise Fatal(
@@ -155,6 +167,123 @@ class DataModel(object):
         buffers = self.build_buffers(index_data, vertex_buffer, excluded_buffers)
         return buffers, len(vertex_buffer)
 
+    @staticmethod
+    def get_masked_vertex_groups(obj: Object) -> NDArray:
+        """Indices of the vertex groups whose weights are exported as 0 (MASK* groups)"""
+        return numpy.array(
+            [vg.index for vg in obj.vertex_groups if vg.name.startswith("MASK")],
+            dtype=numpy.int32,
+        )
+
+    @staticmethod
+    def strcasecmp_natural(name_a: str, name_b: str) -> int:
+        """
+        Port of Blender's BLI_strcasecmp_natural, which vertex_group_sort orders
+        names with. Works on the UTF-8 bytes as signed chars like the C code on
+        x86 builds: '.' sorts before everything, digit runs compare by value with
+        leading zeros as a tie breaker, then falls back to a plain strcmp.
+        """
+        raw_a: bytes = name_a.encode("utf-8")
+        raw_b: bytes = name_b.encode("utf-8")
+        s1: list[int] = [c - 256 if c > 127 else c for c in raw_a] + [0]
+        s2: list[int] = [c - 256 if c > 127 else c for c in raw_b] + [0]
+
+        def isdigit(c: int) -> bool:
+            return 48 <= c <= 57
+
+        def tolower(c: int) -> int:
+            return c + 32 if 65 <= c <= 90 else c
+
+        d1: int = 0
+        d2: int = 0
+        tiebreaker: int = 0
+        while True:
+            if isdigit(s1[d1]) and isdigit(s2[d2]):
+                # left_number_strcmp: skip leading zeros, the longer run of
+                # digits is the bigger number, equal lengths compare digit-wise
+                p1: int = d1
+                p2: int = d2
+                while s1[p1] == 48:
+                    p1 += 1
+                while s2[p2] == 48:
+                    p2 += 1
+                numzero1: int = p1 - d1
+                numzero2: int = p2 - d2
+                numdigit: int = 0
+                while True:
+                    digit1: bool = isdigit(s1[p1 + numdigit])
+                    digit2: bool = isdigit(s2[p2 + numdigit])
+                    if digit1 and digit2:
+                        numdigit += 1
+                        continue
+                    if digit1:
+                        return 1
+                    if digit2:
+                        return -1
+                    break
+                run1: list[int] = s1[p1 : p1 + numdigit]
+                run2: list[int] = s2[p2 : p2 + numdigit]
+                if run1 != run2:
+                    return -1 if run1 < run2 else 1
+                if tiebreaker == 0 and numzero1 != numzero2:
+                    tiebreaker = 1 if numzero1 > numzero2 else -1
+                d1 += 1
+                while isdigit(s1[d1]):
+                    d1 += 1
+                d2 += 1
+                while isdigit(s2[d2]):
+                    d2 += 1
+
+            # Shorter strings are ordered in front
+            if s1[d1] == 0 or s2[d2] == 0:
+                break
+            c1: int = tolower(s1[d1])
+            c2: int = tolower(s2[d2])
+            if c1 != c2:
+                # '.' first so "foo.bar" comes before "foo 1.bar"
+                if c1 == 46:
+                    return -1
+                if c2 == 46:
+                    return 1
+                return -1 if c1 < c2 else 1
+            d1 += 1
+            d2 += 1
+
+        if tiebreaker:
+            return tiebreaker
+        return (raw_a > raw_b) - (raw_a < raw_b)
+
+    @classmethod
+    def get_vertex_group_fill_remap(cls, obj: Object) -> Optional[NDArray]:
+        """
+        Maps vertex group indices to the indices they would have after padding the
+        numeric groups to 0..max and sorting all groups by name. Padding groups are
+        never created, they only shift the exported BLENDINDICES.
+        Returns None when no numeric groups exist (no reordering happens).
+        """
+        names: list[str] = [vg.name for vg in obj.vertex_groups]
+        numeric_ids: set[int] = {int(name) for name in names if name.isdigit()}
+        if not numeric_ids:
+            return None
+        padding: list[str] = [
+            str(i) for i in range(max(numeric_ids) + 1) if i not in numeric_ids
+        ]
+        all_names: list[str] = names + padding
+        if len(all_names) <= 1:
+            return None
+        order = numpy.array(
+            sorted(
+                range(len(all_names)),
+                key=functools.cmp_to_key(
+                    lambda i, j: cls.strcasecmp_natural(all_names[i], all_names[j])
+                ),
+            ),
+            dtype=numpy.int32,
+        )
+        ranks = numpy.empty(len(all_names), dtype=numpy.int32)
+        ranks[order] = numpy.arange(len(all_names), dtype=numpy.int32)
+        return ranks[: len(names)]
+
     def build_buffers(
         self, index_data, vertex_buffer, excluded_buffers
     ) -> dict[str, NumpyBuffer]:
@@ -186,11 +315,25 @@ class DataModel(object):
         return result
 
     def export_data(
-        self, context, collection, mesh, excluded_buffers, mirror_mesh: bool = False
+        self,
+        context,
+        collection,
+        mesh,
+        excluded_buffers,
+        mirror_mesh: bool = False,
+        masked_vgs: Optional[NDArray] = None,
+        vg_remap: Optional[NDArray] = None,
     ) -> tuple[NDArray, NumpyBuffer]:
         export_layout, fetch_loop_data = self.make_export_layout(excluded_buffers)
         index_data, vertex_buffer = self.get_mesh_data(
-            context, collection, mesh, export_layout, fetch_loop_data, mirror_mesh
+            context,
+            collection,
+            mesh,
+            export_layout,
+            fetch_loop_data,
+            mirror_mesh,
+            masked_vgs,
+            vg_remap,
         )
         return index_data, vertex_buffer
 
@@ -234,6 +377,8 @@ class DataModel(object):
         export_layout: BufferLayout,
         fetch_loop_data: bool,
         mirror_mesh: bool = False,
+        masked_vgs: Optional[NDArray] = None,
+        vg_remap: Optional[NDArray] = None,
     ) -> tuple[NDArray, NumpyBuffer]:
         # vertex_ids_cache, cache_vertex_ids = None, False
         vertex_ids_cache = None
@@ -317,6 +462,8 @@ class DataModel(object):
             format_converters,
             vertex_ids_cache,
             flip_winding=flip_winding,
+            masked_vgs=masked_vgs,
+            vg_remap=vg_remap,
         )
 
         # if cache_vertex_ids:
@@ -634,6 +781,8 @@ class DataModelXXMI(DataModel):
         export_layout: BufferLayout,
         fetch_loop_data: bool,
         mirror_mesh: bool = False,
+        masked_vgs: Optional[NDArray] = None,
+        vg_remap: Optional[NDArray] = None,
     ) -> tuple[NDArray, NumpyBuffer]:
         flip_winding: bool = (
             self.flip_winding if not self.mirror_mesh else not self.flip_winding
@@ -700,5 +849,7 @@ class DataModelXXMI(DataModel):
             semantic_converters,
             format_converters,
             flip_winding=flip_winding,
+            masked_vgs=masked_vgs,
+            vg_remap=vg_remap,
         )
         return index_buffer, vertex_buffer
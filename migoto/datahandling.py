@@ -121,7 +121,7 @@ def open_frame_analysis_log_file(dirname: Path) -> FALogFile:
         path = os.path.join(dirname, "..", f"log-0x{context}.txt")
     else:
         path = os.path.join(dirname, "log.txt")
-    return FALogFile(open(path, "r"))
+    return FALogFile.from_path(path)
 
 
 # Parsing the headers for vb0 txt files
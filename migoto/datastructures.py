@@ -1,8 +1,14 @@
+import bisect
 import collections
+import fnmatch
+import hashlib
 import io
 import itertools
+import json
+import os
 import re
 import struct
+import tempfile
 import textwrap
 from enum import Enum
 import numpy
@@ -1001,14 +1007,17 @@ class FALogFile(object):
         def __init__(self):
             dict.__init__(self, {0: {}})
             self.last_draw_call = 0
+            # Draw calls are only ever added in increasing order, so keeping
+            # them in a list alongside the dict gives sorted order for free
+            self.draw_calls = [0]
 
         def prev_draw_call(self, draw_call):
-            return max([i for i in self.keys() if i < draw_call])
+            return self.draw_calls[bisect.bisect_left(self.draw_calls, draw_call) - 1]
 
         # def next_draw_call(self, draw_call):
         #    return min([ i for i in self.keys() if i > draw_call ])
         def subsequent_draw_calls(self, draw_call):
-            return [i for i in sorted(self.keys()) if i >= draw_call]
+            return self.draw_calls[bisect.bisect_left(self.draw_calls, draw_call) :]
 
         def __getitem__(self, draw_call):
             if draw_call > self.last_draw_call:
@@ -1016,6 +1025,7 @@ class FALogFile(object):
                     self, draw_call, dict.__getitem__(self, self.last_draw_call).copy()
                 )
                 self.last_draw_call = draw_call
+                self.draw_calls.append(draw_call)
             elif draw_call not in self.keys():
                 return dict.__getitem__(self, self.prev_draw_call(draw_call))
             return dict.__getitem__(self, draw_call)
@@ -1089,16 +1099,15 @@ class FALogFile(object):
 
         def matched(self, api_match, remain, q, state):
             if self.bind_clears_all_slots:
-                self.sparse_slots[state.draw_call].clear()
+                cleared = None
             else:
-                start_slot = self.start_slot(api_match)
-                for i in range(self.num_bindings(api_match)):
-                    self.sparse_slots[state.draw_call].pop(start_slot + i, None)
-            bindings = self.sparse_slots[state.draw_call]
-            while self.resource_pattern.match(q[0]):
-                # FIXME: Inefficiently calling match twice. I hate that Python
-                # lacks a do/while and every workaround is ugly in some way.
-                resource_match = self.resource_pattern.match(q.popleft())
+                cleared = (self.start_slot(api_match), self.num_bindings(api_match))
+            bindings = []
+            while True:
+                resource_match = self.resource_pattern.match(q.peek())
+                if not resource_match:
+                    break
+                q.popleft()
                 slot = resource_match.group("slot")
                 if slot.isnumeric():
                     slot = int(slot)
@@ -1107,13 +1116,8 @@ class FALogFile(object):
                     view = int(view, 16)
                 address = int(resource_match.group("address"), 16)
                 resource_hash = int(resource_match.group("hash"), 16)
-                bindings[slot] = self.FALogResourceBinding(
-                    slot, view, address, resource_hash
-                )
-                state.resource_index[address].add(
-                    FALogFile.ResourceUse(state.draw_call, self.slot_prefix, slot)
-                )
-            # print(sorted(bindings.items()))
+                bindings.append((slot, view, address, resource_hash))
+            state.apply_bindings(self.slot_prefix, state.draw_call, cleared, bindings)
 
         def start_slot(self, match):
             return int(match.group("StartSlot"))
@@ -1200,57 +1204,368 @@ class FALogFile(object):
     #    bind_clears_all_slots = True
     # FALogParserDrawcall.register(FALogParserOMSetRenderTargets)
 
-    def __init__(self, f):
+    class LogLines(object):
+        """
+        Streams a log file in large chunks and hands out one line at a time,
+        with a single line of lookahead for parsers that consume the lines
+        following the one they matched.
+        """
+
+        chunk_size = 1 << 22
+
+        def __init__(self, f):
+            self.f = f
+            self.lines = collections.deque()
+            self.partial = ""
+            self.eof = False
+
+        def fill(self):
+            while not self.lines and not self.eof:
+                chunk = self.f.read(self.chunk_size)
+                if not chunk:
+                    self.eof = True
+                    if self.partial:
+                        self.lines.append(self.partial)
+                        self.partial = ""
+                    break
+                lines = (self.partial + chunk).split("\n")
+                self.partial = lines.pop()
+                self.lines.extend(lines)
+
+        def __iter__(self):
+            lines = self.lines
+            while True:
+                if not lines:
+                    self.fill()
+                    if not lines:
+                        return
+                yield lines.popleft()
+
+        def peek(self):
+            """Return the next line without consuming it, or '' at end of file"""
+            self.fill()
+            return self.lines[0] if self.lines else ""
+
+        def popleft(self):
+            """Consume and return the next line, or None at end of file"""
+            self.fill()
+            return self.lines.popleft() if self.lines else None
+
+    # Bump whenever the event format changes so stale cached indices get
+    # rebuilt (the tracked slot types are already part of the index key)
+    index_version = 1
+    # Kept in the temp dir rather than next to the log, since creating a file
+    # in the dump would change its mtime and invalidate the catalog sidecar
+    # and the hash index of the folder
+    index_dir = os.path.join("XXMI-Tools", "FrameAnalysisLogIndex")
+
+    def __init__(self, f=None):
         self.draw_call = None
         self.slot_class = {}
         self.resource_index = collections.defaultdict(set)
+        # (slot_type, slot) -> ([draw calls], [bound resource address or None])
+        # recording each draw call where the slot started holding something
+        # else, so the end of a binding can be found with a bisect
+        self.slot_history = {}
+        # Every binding call in the order it was parsed, used to persist the
+        # index without having to re-run the regular expressions
+        self.events = []
         draw_call_parser = self.FALogParserDrawcall(self)
-        # Using a deque for a concise way to use a pop iterator and be able to
-        # peek/consume the following line. Maybe overkill, but shorter code
-        q = collections.deque(f)
-        q.append(None)
-        for line in iter(q.popleft, None):
-            # print(line)
-            if not draw_call_parser.parse(line, q, self):
-                # print(line)
-                pass
+        if f is None:
+            return
+        q = self.LogLines(f)
+        for line in q:
+            # Only lines starting with a draw call number can match, skip the
+            # indented resource lines of calls we don't track cheaply
+            if not line[:1].isdigit():
+                continue
+            draw_call_parser.parse(line, q, self)
+
+    def apply_bindings(self, slot_type, draw_call, cleared, bindings):
+        """
+        Update the slot state for one binding call. cleared is None to clear
+        every slot of this type, or a (start_slot, num_bindings) range.
+        """
+        self.events.append((slot_type, draw_call, cleared, bindings))
+        slots = self.slot_class[slot_type][draw_call]
+        if cleared is None:
+            changed = set(slots)
+            slots.clear()
+        else:
+            start_slot, num_bindings = cleared
+            changed = set()
+            for slot in range(start_slot, start_slot + num_bindings):
+                if slots.pop(slot, None) is not None:
+                    changed.add(slot)
+        for slot, view, address, resource_hash in bindings:
+            slots[slot] = self.FALogParserBindResources.FALogResourceBinding(
+                slot, view, address, resource_hash
+            )
+            changed.add(slot)
+            self.resource_index[address].add(
+                FALogFile.ResourceUse(draw_call, slot_type, slot)
+            )
+        for slot in changed:
+            bound = slots.get(slot)
+            self.record_slot_change(
+                slot_type,
+                slot,
+                draw_call,
+                bound.resource_address if bound is not None else None,
+            )
+        # print(sorted(slots.items()))
+
+    def record_slot_change(self, slot_type, slot, draw_call, address):
+        draw_calls, addresses = self.slot_history.setdefault(
+            (slot_type, slot), ([], [])
+        )
+        if draw_calls and draw_calls[-1] == draw_call:
+            # Rebound again within the same draw call, only the final state
+            # of the draw call counts
+            draw_calls.pop()
+            addresses.pop()
+        prev_address = addresses[-1] if addresses else None
+        if address != prev_address:
+            draw_calls.append(draw_call)
+            addresses.append(address)
+
+    @classmethod
+    def from_path(cls, path, use_index=True):
+        """
+        Parse the log file at path. When use_index is set, a cached index of
+        the log is reused as long as the log size and modification time are
+        unchanged, and (re)written otherwise.
+        """
+        stat = os.stat(path)
+        index_path = cls.index_path(path)
+        if use_index:
+            log = cls.load_index(index_path, stat)
+            if log is not None:
+                return log
+        with open(path, "r") as f:
+            log = cls(f)
+        if use_index:
+            log.save_index(index_path, stat)
+        return log
+
+    @classmethod
+    def index_path(cls, path):
+        log_key = hashlib.blake2b(
+            os.path.abspath(path).encode(), digest_size=8
+        ).hexdigest()
+        return os.path.join(tempfile.gettempdir(), cls.index_dir, log_key + ".json")
+
+    @classmethod
+    def index_key(cls, stat):
+        return {
+            "version": cls.index_version,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "slot_types": sorted(
+                parser.slot_prefix
+                for parser in cls.FALogParserDrawcall.next_parsers_classes
+            ),
+        }
+
+    @classmethod
+    def load_index(cls, index_path, stat):
+        try:
+            with open(index_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("key") != cls.index_key(stat):
+            return None
+        log = cls()
+        for slot_type, draw_call, cleared, bindings in data["events"]:
+            log.apply_bindings(
+                slot_type,
+                draw_call,
+                tuple(cleared) if cleared is not None else None,
+                [tuple(binding) for binding in bindings],
+            )
+        log.draw_call = data["draw_call"]
+        return log
+
+    def save_index(self, index_path, stat):
+        data = {
+            "key": self.index_key(stat),
+            "draw_call": self.draw_call,
+            "events": self.events,
+        }
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            with open(index_path, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+        except OSError as e:
+            print("Unable to write frame analysis log index {}: {}".format(index_path, e))
 
     def find_resource_uses(self, resource_address, slot_class=None):
         """
         Find draw calls + slots where this resource is used.
         """
-        # return [ x for x in sorted(self.resource_index[resource_address]) if x.slot_type == slot_class ]
         ret = set()
-        for bound in sorted(self.resource_index[resource_address]):
+        for bound in self.resource_index[resource_address]:
             if slot_class is not None and bound.slot_type != slot_class:
                 continue
             # Resource was bound in this draw call, but could potentially have
             # been left bound in subsequent draw calls that we also want to
             # return, so return a range of draw calls if appropriate:
-            sparse_slots = self.slot_class[bound.slot_type]
-            for sparse_draw_call in sparse_slots.subsequent_draw_calls(bound.draw_call):
-                if (
-                    bound.slot not in sparse_slots[sparse_draw_call]
-                    or sparse_slots[sparse_draw_call][bound.slot].resource_address
-                    != resource_address
-                ):
-                    # print('x', sparse_draw_call, sparse_slots[sparse_draw_call][bound.slot])
-                    for draw_call in range(bound.draw_call, sparse_draw_call):
-                        ret.add(
-                            FALogFile.ResourceUse(
-                                draw_call, bound.slot_type, bound.slot
-                            )
-                        )
-                    break
-                # print('y', sparse_draw_call, sparse_slots[sparse_draw_call][bound.slot])
+            draw_calls, addresses = self.slot_history[(bound.slot_type, bound.slot)]
+            i = bisect.bisect_right(draw_calls, bound.draw_call) - 1
+            if i < 0 or addresses[i] != resource_address:
+                # Replaced again before the end of the same draw call
+                continue
+            if i + 1 < len(draw_calls):
+                end = draw_calls[i + 1]
             else:
-                # I love Python's for/else clause. Means we didn't hit the
-                # above break so the resource was still bound at end of frame
-                for draw_call in range(bound.draw_call, self.draw_call):
-                    ret.add(
-                        FALogFile.ResourceUse(draw_call, bound.slot_type, bound.slot)
-                    )
+                # Still bound at end of frame
+                end = self.draw_call
+            for draw_call in range(bound.draw_call, end):
+                ret.add(FALogFile.ResourceUse(draw_call, bound.slot_type, bound.slot))
         return ret
 
 
+class FrameAnalysisCatalog(object):
+    """
+    Lists a frame analysis dump directory once and parses every buffer file
+    name into lookup tables, so finding the sibling vertex/index buffers,
+    .buf twins and stream output buffers of a draw call are dict lookups
+    instead of repeated globs over a directory with tens of thousands of
+    files. The file list can be persisted in a sidecar keyed by the
+    directory mtime.
+    """
+
+    buffer_pattern = re.compile(
+        r"""-(?:ib|vb[0-9]+)(?P<hash>=[0-9a-f]+)?(?=[^0-9a-f=])"""
+    )
+    buffer_token_pattern = re.compile(
+        r"""-(?:(?P<ib>ib)|vb(?P<slot>[0-9]+))(?:=(?P<hash>[0-9a-f]+))?$"""
+    )
+    shader_pattern = re.compile(r"""-(?P<stage>[vhdgpc]s)=(?P<hash>[0-9a-f]+)""")
+    BufferFile = collections.namedtuple(
+        "BufferFile", ["name", "draw_call", "kind", "slot", "hash", "shaders"]
+    )
+
+    index_version = 1
+    index_name = ".frame_analysis_catalog.json"
+
+    def __init__(self, dirname, names):
+        self.dirname = dirname
+        self.names = sorted(names)
+        self.name_set = set(self.names)
+        # name -> BufferFile
+        self.buffers = {}
+        # (text before the buffer token, text after it) -> {"ib": [...], "vb": [...]}
+        self.siblings = collections.defaultdict(lambda: {"ib": [], "vb": []})
+        # buffer token including hash (e.g. "-vb0=1234abcd") -> [.txt names]
+        self.txt_by_token = collections.defaultdict(list)
+        # draw call prefix (e.g. "000123") -> [vertex buffer .txt names]
+        self.vb_txt_by_prefix = collections.defaultdict(list)
+        for name in self.names:
+            match = self.buffer_pattern.search(name)
+            if match is None:
+                continue
+            prefix, token, suffix = (
+                name[: match.start()],
+                name[match.start() : match.end()],
+                name[match.end() :],
+            )
+            token_match = self.buffer_token_pattern.match(token)
+            kind = "ib" if token_match.group("ib") else "vb"
+            slot = token_match.group("slot")
+            self.buffers[name] = self.BufferFile(
+                name,
+                int(prefix) if prefix.isdigit() else None,
+                kind,
+                int(slot) if slot is not None else None,
+                token_match.group("hash"),
+                dict(self.shader_pattern.findall(suffix)),
+            )
+            self.siblings[(prefix, suffix)][kind].append(name)
+            if name.endswith(".txt"):
+                if match.group("hash"):
+                    self.txt_by_token[token].append(name)
+                if kind == "vb":
+                    self.vb_txt_by_prefix[prefix].append(name)
+
+    @classmethod
+    def from_dir(cls, dirname, use_index=True):
+        """
+        Catalog dirname, reusing the sidecar file list when use_index is set
+        and the directory has not changed since it was written.
+        """
+        index_path = os.path.join(dirname, cls.index_name)
+        if use_index:
+            try:
+                with open(index_path, "r") as f:
+                    data = json.load(f)
+                if data.get("key") == cls.index_key(dirname):
+                    return cls(dirname, data["names"])
+            except (OSError, ValueError):
+                pass
+        with os.scandir(dirname) as it:
+            names = [
+                entry.name
+                for entry in it
+                if entry.is_file() and entry.name != cls.index_name
+            ]
+        catalog = cls(dirname, names)
+        if use_index:
+            catalog.save_index(index_path)
+        return catalog
+
+    @classmethod
+    def index_key(cls, dirname):
+        return {
+            "version": cls.index_version,
+            "mtime_ns": os.stat(dirname).st_mtime_ns,
+        }
+
+    def save_index(self, index_path):
+        try:
+            # Creating the sidecar bumps the directory mtime, but rewriting it
+            # in place afterwards does not, so create it first and only then
+            # record the mtime it should be valid for
+            if not os.path.exists(index_path):
+                open(index_path, "w").close()
+            data = {"key": self.index_key(self.dirname), "names": self.names}
+            with open(index_path, "w") as f:
+                json.dump(data, f, separators=(",", ":"))
+        except OSError as e:
+            print("Unable to write frame analysis catalog {}: {}".format(index_path, e))
+
+    def path(self, name):
+        return os.path.join(self.dirname, name)
+
+    def exists(self, name):
+        return name in self.name_set
+
+    def related_txt(self, name):
+        """.txt files for every draw call using the same buffer + hash as name"""
+        match = self.buffer_pattern.search(name)
+        if match is None or not match.group("hash"):
+            return []
+        return self.txt_by_token.get(name[match.start() : match.end()], [])
+
+    def sibling_buffers(self, name):
+        """(index buffer names, vertex buffer names) dumped alongside name"""
+        match = self.buffer_pattern.search(name)
+        entry = self.siblings.get((name[: match.start()], name[match.end() :]))
+        if entry is None:
+            return [], []
+        return list(entry["ib"]), list(entry["vb"])
+
+    def vertex_buffer_txt(self, draw_call):
+        """All vertex buffer .txt files dumped for the given draw call number"""
+        return list(self.vb_txt_by_prefix.get(f"{draw_call:06}", []))
+
+    def glob(self, pattern):
+        """Names matching a glob pattern, narrowed by its literal prefix"""
+        literal = re.match(r"[^*?\[]*", pattern).group()
+        start = bisect.bisect_left(self.names, literal)
+        end = bisect.bisect_left(self.names, literal + "\U0010ffff", start)
+        return fnmatch.filter(self.names[start:end], pattern)
+
+
 VBSOMapEntry = collections.namedtuple("VBSOMapEntry", ["draw_call", "slot"])
@@ -0,0 +1,459 @@
+"""
+XXMI Tools CHN — FrameAnalysis 跨 Dump 哈希索引
+==========================================
+在包含多个 FrameAnalysis-* 文件夹的根目录下维护一个 SQLite 索引，
+记录 hash → (文件夹, Draw Call, 槽位, 拓扑, 顶点/索引数, 布局)，
+以便直接查到某个 VB/IB 哈希出现在哪个 Dump 的哪个 Draw Call，并一键导入。
+
+- 文件名解析沿用 FrameAnalysisCatalog，顶点布局沿用 parse_buffer_headers；
+- 按文件夹增量更新：文件夹修改时间未变则跳过，已删除的文件夹从索引中移除。
+"""
+
+import os
+import json
+import sqlite3
+import collections
+
+import bpy
+from bpy.props import StringProperty, IntProperty, CollectionProperty, PointerProperty
+from bpy.types import Operator, PropertyGroup, Panel
+
+from .datastructures import FrameAnalysisCatalog
+from .datahandling import parse_buffer_headers
+
+
+INDEX_FILENAME = ".xxmi_hash_index.sqlite"
+SCHEMA_VERSION = 1
+# 头部按小块读取，读到第一个顶点完整为止；HEADER_LIMIT 为读取上限
+HEADER_CHUNK = 2048
+HEADER_LIMIT = 1 << 16
+# 面板中最多显示的结果数
+MAX_DISPLAY_HITS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buffers (
+    hash TEXT NOT NULL,
+    folder_id INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    draw_call INTEGER,
+    kind TEXT NOT NULL,
+    slot INTEGER,
+    topology TEXT,
+    count INTEGER,
+    stride INTEGER,
+    format TEXT,
+    layout TEXT,
+    shaders TEXT
+);
+CREATE INDEX IF NOT EXISTS buffers_hash ON buffers (hash);
+CREATE INDEX IF NOT EXISTS buffers_folder ON buffers (folder_id);
+"""
+
+HashHit = collections.namedtuple(
+    "HashHit",
+    ["folder", "filename", "draw_call", "kind", "slot", "topology", "count", "stride", "format", "layout", "shaders"],
+)
+
+
+# ============================================================
+# 头部解析
+# ============================================================
+
+def read_buffer_header(path, kind):
+    """
+    读取 Frame Analysis .txt 的头部字段。
+    vb 额外返回布局：只保留第一个顶点中真正出现的元素（即属于该槽位的元素）。
+    """
+    with open(path, "r", errors="replace") as f:
+        text = ""
+        while len(text) < HEADER_LIMIT:
+            chunk = f.read(HEADER_CHUNK)
+            if not chunk:
+                break
+            text += chunk
+            if _header_complete(text, kind):
+                break
+
+    header, sep, data = text.partition("vertex-data:" if kind == "vb" else "\n\n")
+    fields = {}
+    for line in header.splitlines():
+        key, colon, value = line.strip().partition(":")
+        if colon and not line.startswith((" ", "\t")):
+            fields[key] = value.strip()
+
+    result = {
+        "topology": fields.get("topology"),
+        "stride": _to_int(fields.get("stride")),
+        "format": fields.get("format"),
+        "layout": None,
+    }
+    if kind == "vb":
+        result["count"] = _to_int(fields.get("vertex count"))
+        if sep and "element[" in header:
+            # 第一个顶点的数据行，作为 parse_buffer_headers 的元素过滤器
+            first_vertex = data.lstrip("\r\n").split("\n\n", 1)[0]
+            elements = parse_buffer_headers(header, first_vertex)
+            result["layout"] = json.dumps(
+                [(e["element_name"], e["format"]) for e in elements], separators=(",", ":")
+            )
+    else:
+        result["count"] = _to_int(fields.get("index count"))
+    return result
+
+
+def _header_complete(text, kind):
+    """ib 头部以空行结束；vb 需要读到 vertex-data: 之后第一个顶点结束的空行"""
+    if kind != "vb":
+        return "\n\n" in text
+    _, sep, data = text.partition("vertex-data:")
+    return bool(sep) and "\n\n" in data.lstrip("\r\n")
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_hash(value):
+    """接受 '1a2b3c4d'、'=1A2B3C4D'、'0x1a2b3c4d' 等写法"""
+    value = value.strip().lower().lstrip("=")
+    if value.startswith("0x"):
+        value = value[2:]
+    return value
+
+
+# ============================================================
+# SQLite 索引
+# ============================================================
+
+class HashIndex:
+    """根目录下所有 FrameAnalysis 文件夹的哈希索引"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.db_path = os.path.join(self.root, INDEX_FILENAME)
+        try:
+            self.conn, version = self._connect()
+        except sqlite3.OperationalError:
+            # 被其他实例锁定、目录只读等情况下索引本身是完好的，不能删除
+            raise
+        except sqlite3.DatabaseError:
+            # 索引文件损坏（file is not a database）时直接重建，
+            # 索引内容都可以从 Dump 重新生成
+            try:
+                os.remove(self.db_path)
+            except FileNotFoundError:
+                pass
+            self.conn, version = self._connect()
+        if version != SCHEMA_VERSION:
+            self.conn.executescript(
+                "DROP TABLE IF EXISTS buffers; DROP TABLE IF EXISTS folders;"
+            )
+            self.conn.executescript(SCHEMA)
+            self.conn.execute("PRAGMA user_version = %d" % SCHEMA_VERSION)
+            self.conn.commit()
+
+    def _connect(self):
+        """打开索引，返回 (连接, 架构版本)"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # 回滚日志放在内存中：提交时不会在根目录下新建/删除 -journal 文件，
+            # 根目录本身是 FrameAnalysis 文件夹时其修改时间才不会因索引写入而改变
+            conn.execute("PRAGMA journal_mode = MEMORY")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        except sqlite3.DatabaseError:
+            conn.close()
+            raise
+        return conn, version
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def find_dump_folders(self):
+        """根目录下的 FrameAnalysis-* 文件夹；根目录本身是 Dump 时也包含在内"""
+        folders = []
+        if os.path.basename(self.root).startswith("FrameAnalysis"):
+            folders.append(self.root)
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.is_dir() and entry.name.startswith("FrameAnalysis"):
+                    folders.append(entry.path)
+        return sorted(folders)
+
+    def update(self, progress=None):
+        """
+        增量更新索引，返回 (重新索引的文件夹数, 跳过数, 移除数, 新写入的缓冲区条目数)。
+        progress(已处理, 总数) 可选，用于汇报进度。
+        """
+        folders = self.find_dump_folders()
+        known = {
+            path: (folder_id, mtime_ns)
+            for folder_id, path, mtime_ns in self.conn.execute("SELECT id, path, mtime_ns FROM folders")
+        }
+
+        removed = 0
+        present = set(folders)
+        for path, (folder_id, _) in known.items():
+            if path not in present:
+                self._delete_folder(folder_id)
+                removed += 1
+
+        updated = skipped = entries = 0
+        for i, folder in enumerate(folders):
+            if progress:
+                progress(i, len(folders))
+            previous = known.get(folder)
+            if previous is not None and previous[1] == os.stat(folder).st_mtime_ns:
+                skipped += 1
+                continue
+            if previous is not None:
+                self._delete_folder(previous[0])
+            # 建立目录清单时可能会新建清单附属文件，因此在其之后再记录修改时间
+            catalog = FrameAnalysisCatalog.from_dir(folder)
+            mtime_ns = os.stat(folder).st_mtime_ns
+            entries += self._index_folder(folder, catalog, mtime_ns)
+            updated += 1
+        self.conn.commit()
+        return updated, skipped, removed, entries
+
+    def _delete_folder(self, folder_id):
+        self.conn.execute("DELETE FROM buffers WHERE folder_id = ?", (folder_id,))
+        self.conn.execute("DELETE FROM folders WHERE id = ?", (folder_id,))
+
+    def _index_folder(self, folder, catalog, mtime_ns):
+        cursor = self.conn.execute(
+            "INSERT INTO folders (path, mtime_ns) VALUES (?, ?)", (folder, mtime_ns)
+        )
+        folder_id = cursor.lastrowid
+        rows = []
+        for name, buf in catalog.buffers.items():
+            if not buf.hash or not name.endswith(".txt"):
+                continue
+            try:
+                header = read_buffer_header(os.path.join(folder, name), buf.kind)
+            except (OSError, IndexError, ValueError) as e:
+                print(f"[XXMI] 跳过无法解析的文件 {name}: {e}")
+                continue
+            rows.append((
+                buf.hash, folder_id, name, buf.draw_call, buf.kind, buf.slot,
+                header["topology"], header["count"], header["stride"], header["format"],
+                header["layout"], json.dumps(buf.shaders, separators=(",", ":")) if buf.shaders else None,
+            ))
+        self.conn.executemany(
+            "INSERT INTO buffers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        return len(rows)
+
+    def lookup(self, hash_value, limit=None):
+        """按哈希查询，结果按文件夹与 Draw Call 排序"""
+        query = (
+            "SELECT f.path, b.filename, b.draw_call, b.kind, b.slot, b.topology, b.count,"
+            " b.stride, b.format, b.layout, b.shaders"
+            " FROM buffers b JOIN folders f ON f.id = b.folder_id"
+            " WHERE b.hash = ? ORDER BY f.path, b.draw_call, b.kind, b.slot"
+        )
+        params = [normalize_hash(hash_value)]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [HashHit(*row) for row in self.conn.execute(query, params)]
+
+
+# ============================================================
+# 属性
+# ============================================================
+
+class XXMI_HashIndexHit(PropertyGroup):
+    folder: StringProperty()
+    filename: StringProperty()
+    draw_call: IntProperty(default=-1)
+    summary: StringProperty()
+    layout_text: StringProperty()
+
+
+class XXMI_HashIndexProperties(PropertyGroup):
+    root: StringProperty(
+        name="根目录",
+        description="包含多个 FrameAnalysis-* 文件夹的目录（通常是游戏的 3DMigoto 目录）",
+        subtype='DIR_PATH',
+    )
+    query: StringProperty(
+        name="哈希",
+        description="要查找的 VB/IB 哈希，例如 1a2b3c4d",
+    )
+    hits: CollectionProperty(type=XXMI_HashIndexHit)
+    total_hits: IntProperty(default=0)
+
+
+def _get_root(context):
+    props = context.scene.xxmi_hash_index_props
+    root = bpy.path.abspath(props.root) if props.root else ""
+    return root.rstrip("\\/") if root else ""
+
+
+# ============================================================
+# Operators
+# ============================================================
+
+class XXMI_OT_HashIndexUpdate(Operator):
+    """扫描根目录下的所有 FrameAnalysis 文件夹，增量更新哈希索引"""
+    bl_idname = "xxmi.hash_index_update"
+    bl_label = "更新索引"
+
+    def execute(self, context):
+        root = _get_root(context)
+        if not root or not os.path.isdir(root):
+            self.report({'ERROR'}, "请先设置有效的根目录")
+            return {'CANCELLED'}
+
+        wm = context.window_manager
+        wm.progress_begin(0, 100)
+        try:
+            with HashIndex(root) as index:
+                updated, skipped, removed, entries = index.update(
+                    progress=lambda i, n: wm.progress_update(int(100 * i / max(n, 1)))
+                )
+        except (OSError, sqlite3.Error) as e:
+            self.report({'ERROR'}, f"索引更新失败: {e}")
+            return {'CANCELLED'}
+        finally:
+            wm.progress_end()
+
+        self.report(
+            {'INFO'},
+            f"索引完成：更新 {updated} 个文件夹（{entries} 条缓冲区），未变化 {skipped} 个，移除 {removed} 个",
+        )
+        return {'FINISHED'}
+
+
+class XXMI_OT_HashIndexSearch(Operator):
+    """在哈希索引中查找 VB/IB 哈希"""
+    bl_idname = "xxmi.hash_index_search"
+    bl_label = "查找"
+
+    def execute(self, context):
+        props = context.scene.xxmi_hash_index_props
+        root = _get_root(context)
+        if not root or not os.path.exists(os.path.join(root, INDEX_FILENAME)):
+            self.report({'ERROR'}, "索引不存在，请先更新索引")
+            return {'CANCELLED'}
+        if not normalize_hash(props.query):
+            self.report({'WARNING'}, "请输入哈希")
+            return {'CANCELLED'}
+
+        try:
+            with HashIndex(root) as index:
+                hits = index.lookup(props.query)
+        except (OSError, sqlite3.Error) as e:
+            self.report({'ERROR'}, f"索引查询失败: {e}")
+            return {'CANCELLED'}
+
+        props.hits.clear()
+        props.total_hits = len(hits)
+        for hit in hits[:MAX_DISPLAY_HITS]:
+            item = props.hits.add()
+            item.folder = hit.folder
+            item.filename = hit.filename
+            item.draw_call = hit.draw_call if hit.draw_call is not None else -1
+            slot = "ib" if hit.kind == "ib" else f"vb{hit.slot}"
+            count = "顶点" if hit.kind == "vb" else "索引"
+            item.summary = f"{os.path.basename(hit.folder)}  #{hit.draw_call}  {slot}  {hit.topology or '?'}  {count} {hit.count}"
+            if hit.layout:
+                item.layout_text = ", ".join(f"{name} {fmt}" for name, fmt in json.loads(hit.layout))
+            elif hit.format:
+                item.layout_text = hit.format
+
+        self.report({'INFO'}, f"找到 {len(hits)} 处使用")
+        return {'FINISHED'}
+
+
+class XXMI_OT_HashIndexImport(Operator):
+    """使用 3DMigoto Frame Analysis 导入器导入该 Draw Call"""
+    bl_idname = "xxmi.hash_index_import"
+    bl_label = "导入"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    folder: StringProperty()
+    filename: StringProperty()
+
+    def execute(self, context):
+        path = os.path.join(self.folder, self.filename)
+        if not os.path.exists(path):
+            self.report({'ERROR'}, f"文件不存在，索引可能已过期: {path}")
+            return {'CANCELLED'}
+        if not hasattr(bpy.ops.import_mesh, "migoto_frame_analysis"):
+            self.report({'ERROR'}, "未检测到 3DMigoto 导入器")
+            return {'CANCELLED'}
+        return bpy.ops.import_mesh.migoto_frame_analysis(
+            'EXEC_DEFAULT',
+            filepath=path,
+            files=[{"name": self.filename}],
+        )
+
+
+# ============================================================
+# 面板
+# ============================================================
+
+class XXMI_PT_HashIndexPanel(Panel):
+    bl_label = "Dump 哈希索引"
+    bl_idname = "XXMI_PT_HashIndexPanel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_parent_id = "XXMI_PT_Sidebar"
+    bl_order = 11
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        layout = self.layout
+        if not hasattr(context.scene, "xxmi_hash_index_props"):
+            layout.label(text="需重启插件刷新属性", icon="ERROR")
+            return
+        props = context.scene.xxmi_hash_index_props
+
+        col = layout.column(align=True)
+        col.prop(props, "root", text="")
+        col.operator("xxmi.hash_index_update", icon='FILE_REFRESH')
+
+        row = layout.row(align=True)
+        row.prop(props, "query", text="", icon='VIEWZOOM')
+        row.operator("xxmi.hash_index_search", text="", icon='VIEWZOOM')
+
+        if props.total_hits:
+            layout.label(text=f"共 {props.total_hits} 处，显示前 {len(props.hits)} 处")
+        for hit in props.hits:
+            box = layout.box()
+            row = box.row()
+            row.label(text=hit.summary)
+            op = row.operator("xxmi.hash_index_import", text="", icon='IMPORT')
+            op.folder = hit.folder
+            op.filename = hit.filename
+            if hit.layout_text:
+                box.label(text=hit.layout_text)
+
+
+# ============================================================
+# 注册
+# ============================================================
+
+def register():
+    if not hasattr(bpy.types.Scene, "xxmi_hash_index_props"):
+        bpy.types.Scene.xxmi_hash_index_props = PointerProperty(type=XXMI_HashIndexProperties)
+
+
+def unregister():
+    if hasattr(bpy.types.Scene, "xxmi_hash_index_props"):
+        del bpy.types.Scene.xxmi_hash_index_props
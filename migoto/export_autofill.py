@@ -36,9 +36,6 @@ class XXMI_OT_ExportWithAutoFill(bpy.types.Operator):
         if context.mode != 'OBJECT':
             bpy.ops.object.mode_set(mode='OBJECT')
 
-        # 用于追踪修改过的物体对列表： [(original_obj, temp_obj, original_name), ...]
-        processed_pairs = []
-        
         try:
             # --- 1. 扫描目标：当前场景所有可见的网格 ---
             target_objects = [
@@ -52,88 +49,25 @@ class XXMI_OT_ExportWithAutoFill(bpy.types.Operator):
 
             self.report({'INFO'}, f"正在处理 {len(target_objects)} 个可见网格...")
 
-            # --- 2. 偷天换日：创建替身 ---
-            for obj in target_objects:
-                # A. 记录原始名字
-                original_name = obj.name
-                
-                # B. 将原始物体改名"隐身"
-                # 这一步至关重要：防止导出器通过名字找到原始物体
-                obj.name = original_name + "_XXMI_HIDDEN"
-                
-                # C. 创建临时副本 (深拷贝 Mesh 数据)
-                temp_mesh = obj.data.copy()
-                temp_obj = obj.copy()
-                temp_obj.data = temp_mesh
-                
-                # D. 让临时副本"顶包"：使用原始名字
-                temp_obj.name = original_name 
-                
-                # E. 链接到原始物体所在的集合
-                # 这样可以保持层级结构，防止导出器因集合结构改变而报错
-                for col in obj.users_collection:
-                    if temp_obj.name not in col.objects:
-                        col.objects.link(temp_obj)
-                
-                # 记录这一对，方便后续清理
-                processed_pairs.append((obj, temp_obj, original_name))
-                
-                # --- 3. 核心逻辑 (补全 & 排序) ---
-                
-                # 3.1 补全顶点组 (0 ~ Max)
-                max_id = -1
-                existing_names = set()
-                
-                # 扫描现有数字组
-                for vg in temp_obj.vertex_groups:
-                    if vg.name.isdigit():
-                        gid = int(vg.name)
-                        existing_names.add(gid)
-                        if gid > max_id:
-                            max_id = gid
-                
-                # 填补空缺 (默认权重为0，不影响模型外观)
-                if max_id >= 0:
-                    for i in range(max_id + 1):
-                        if i not in existing_names:
-                            temp_obj.vertex_groups.new(name=str(i))
-                
-                # 3.2 排序
-                # 修复：仅当存在数字顶点组（即确实执行了补全）时才排序
-                # 对于纯非数字顶点组（如 PMX 骨骼名）的模型，排序会改变
-                # 顶点组的内部 index，导致导出的 BLENDINDICES 与原版导出不一致
-                if max_id >= 0 and len(temp_obj.vertex_groups) > 1:
-                    # 必须选中当前物体才能执行 ops
-                    bpy.ops.object.select_all(action='DESELECT')
-                    temp_obj.select_set(True)
-                    context.view_layer.objects.active = temp_obj
-                    
-                    try:
-                        # Blender 按名称排序能正确处理数字 (0, 1, 2, 10...)
-                        bpy.ops.object.vertex_group_sort(sort_type='NAME')
-                    except Exception as e:
-                        print(f"[XXMI] 警告: {temp_obj.name} 顶点组排序跳过 ({str(e)})")
-
-            # --- 4. 准备导出环境 ---
-            # 此时场景里，原始物体名字变成了 _HIDDEN，临时物体名字是正常的。
-            # 我们只选中所有临时物体。
+            # --- 2. 准备导出环境 ---
+            # 不再复制网格或真实创建/排序顶点组：导出器在 get_vertex_data 中
+            # 用查找表把顶点组序号虚拟映射为"补全 0~Max 并按名称排序"后的序号
             bpy.ops.object.select_all(action='DESELECT')
-            for orig, temp, name in processed_pairs:
-                temp.select_set(True)
+            for obj in target_objects:
+                obj.select_set(True)
             
             # 设置激活物体 (防止导出器需要上下文)
-            if processed_pairs:
-                context.view_layer.objects.active = processed_pairs[0][1]
+            context.view_layer.objects.active = target_objects[0]
 
-            # --- 5. 调用原始导出器 ---
+            # --- 3. 调用原始导出器 ---
             self.report({'INFO'}, "正在调用原始导出器...")
             
             # 调用插件原本的导出命令
-            # 因为 xxmi_settings.only_selected = True，且只有临时物体被选中
-            # 导出器会认为这些临时物体就是我们要导出的内容
-            bpy.ops.xxmi.exportadvanced('INVOKE_DEFAULT')
+            # 因为 xxmi_settings.only_selected = True，且只有可见网格被选中
+            # 导出器只会处理这些物体，并对 BLENDINDICES 应用虚拟补全映射
+            bpy.ops.xxmi.exportadvanced('INVOKE_DEFAULT', fill_vertex_groups=True)
 
-            # --- 5.5 处理 DISABLED 前缀 ---
+            # --- 3.5 处理 DISABLED 前缀 ---
             if hasattr(scene, "xxmi_autofill_props") and scene.xxmi_autofill_props.disabled_prefix:
                 try:
                     dump_path = Path(xxmi_settings.dump_path)
@@ -152,7 +86,7 @@ class XXMI_OT_ExportWithAutoFill(bpy.types.Operator):
                 except Exception as e:
                     self.report({'WARNING'}, f"添加 DISABLED 前缀失败: {str(e)}")
 
-            # --- 5.6 自动执行 INI 预览（根据用户设置决定是否打开窗口）---
+            # --- 3.6 自动执行 INI 预览（根据用户设置决定是否打开窗口）---
             show_preview = True
             if hasattr(scene, "xxmi_autofill_props"):
                 show_preview = scene.xxmi_autofill_props.show_ini_preview
@@ -169,30 +103,13 @@ class XXMI_OT_ExportWithAutoFill(bpy.types.Operator):
             traceback.print_exc()
             
         finally:
-            # --- 6. 战场打扫 (还原一切) ---
+            # --- 4. 战场打扫 (还原一切) ---
             # 无论成功失败，必须执行，否则场景会乱套
             
             if context.mode != 'OBJECT':
                 bpy.ops.object.mode_set(mode='OBJECT')
             
-            # A. 销毁临时物体，还原原始物体名字
-            for orig_obj, temp_obj, original_name in processed_pairs:
-                # 1. 删除临时物体及其 Mesh 数据
-                try:
-                    temp_mesh = temp_obj.data
-                    bpy.data.objects.remove(temp_obj, do_unlink=True)
-                    if temp_mesh:
-                        bpy.data.meshes.remove(temp_mesh, do_unlink=True)
-                except:
-                    print(f"警告: 删除临时物体失败 {original_name}")
-
-                # 2. 还原原始物体名字
-                try:
-                    orig_obj.name = original_name
-                except:
-                    print(f"��告: 还原原始物体名称失败 {original_name}")
-
-            # B. 恢复原始选择状态
+            # A. 恢复原始选择状态
             try:
                 bpy.ops.object.select_all(action='DESELECT')
                 for obj in original_selection:
@@ -204,7 +121,7 @@ class XXMI_OT_ExportWithAutoFill(bpy.types.Operator):
             except:
                 pass
             
-            # C. 恢复插件设置
+            # B. 恢复插件设置
             try:
                 xxmi_settings.only_selected = original_only_selected_setting
                 xxmi_settings.ignore_hidden = original_ignore_hidden_setting
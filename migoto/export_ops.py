@@ -569,6 +569,13 @@ class ExportAdvancedOperator(Operator):
     bl_options = {"REGISTER"}
     operations = []
 
+    fill_vertex_groups: BoolProperty(
+        name="Fill vertex groups",
+        description="Export BLENDINDICES as if numeric vertex groups were padded to 0..max and sorted by name",
+        default=False,
+        options={"HIDDEN", "SKIP_SAVE"},
+    )
+
     def execute(self, context):
         scene = bpy.context.scene
         xxmi: XXMIProperties = scene.xxmi
@@ -601,6 +608,7 @@ class ExportAdvancedOperator(Operator):
                 template=Path(xxmi.template_path)
                 if xxmi.use_custom_template != ""
                 else None,
+                fill_vertex_groups=self.fill_vertex_groups,
             )
             mod_exporter.export()
         except Fatal as e:
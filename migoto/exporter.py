@@ -1,9 +1,12 @@
+import bisect
+import hashlib
 import shutil
+import tempfile
 import time
 import json
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Union
+from typing import Callable, Iterable, Optional, Union
 
 import bpy
 import numpy
@@ -24,6 +27,48 @@ from .data.ini_format import INI_file
 from .datastructures import GameEnum
 from .operators import Fatal
 
+# Outline vectors are cached per component in the user's temp folder, never
+# in the mod output that gets distributed.
+# Bump the version whenever calc_outline_vectors changes its results.
+CACHE_ROOT_DIR: str = "XXMI-Tools"
+OUTLINE_CACHE_DIR: str = "OutlineCache"
+OUTLINE_CACHE_VERSION: int = 1
+TANGENT_CACHE_DIR: str = "TangentCache"
+
+
+def unit_vector(vector: NDArray) -> NDArray:
+    """Normalize the input vectors to unit length."""
+    norm = numpy.linalg.norm(vector, axis=1, keepdims=True)
+    norm = numpy.where(norm == 0, 1, norm)
+    return vector / norm
+
+
+class NamePrefixIndex:
+    """Sorted name index answering `name.startswith(prefix)` queries with bisect."""
+
+    def __init__(
+        self,
+        items: Iterable,
+        key: Callable[..., str] = lambda item: item.name,
+    ) -> None:
+        entries: list[tuple] = sorted(
+            ((key(item), i, item) for i, item in enumerate(items)),
+            key=lambda entry: (entry[0], entry[1]),
+        )
+        self.keys: list[str] = [entry[0] for entry in entries]
+        self.items: list = [entry[2] for entry in entries]
+
+    def startswith(self, prefix: str) -> list:
+        """Items whose key starts with prefix, in key order."""
+        start: int = bisect.bisect_left(self.keys, prefix)
+        end: int = start
+        while end < len(self.keys) and self.keys[end].startswith(prefix):
+            end += 1
+        return self.items[start:end]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
 
 @dataclass
 class SubObj:
@@ -97,6 +142,9 @@ class ModExporter:
     write_ini: bool
     template: Optional[Path] = None
     outline_rounding_precision: int = 3
+    outline_cache: bool = True
+    tangent_cache_to_disk: bool = False
+    fill_vertex_groups: bool = False
     # Internal / not implemented
     ignore_muted_shape_keys: bool = False
     # Output
@@ -145,6 +193,7 @@ class ModExporter:
             raise Fatal(
                 "ERROR: Cannot find match for name. Double check you are exporting as ObjectName.vb to the original data folder, that ObjectName exists in scene and that hash.json exists"
             )
+        self.__selected_objs: set[Object] = set(bpy.context.selected_objects)
         candidate_objs: list[Object] = (
             [obj for obj in bpy.context.selected_objects]
             if self.only_selected
@@ -153,8 +202,15 @@ class ModExporter:
         if self.ignore_hidden:
             candidate_objs = [obj for obj in candidate_objs if obj.visible_get()]
         if self.only_selected:
-            selected_objs = [obj for obj in bpy.context.selected_objects]
-            candidate_objs = [obj for obj in candidate_objs if obj in selected_objs]
+            candidate_objs = [
+                obj for obj in candidate_objs if obj in self.__selected_objs
+            ]
+        # One pass over the scene and collections, then every component/part
+        # lookup is a bisect over the sorted names.
+        obj_index: NamePrefixIndex = NamePrefixIndex(candidate_objs)
+        col_index: NamePrefixIndex = NamePrefixIndex(
+            bpy.data.collections, key=lambda col: col.name.lower()
+        )
         self.mod_file = ModFile(
             name=self.mod_name,
             components=[],
@@ -176,9 +232,7 @@ class ModExporter:
                 ib=component.get("ib", ""),
                 strides={},
             )
-            comp_matching_objs: list[Object] = [
-                obj for obj in candidate_objs if obj.name.startswith(current_name)
-            ]
+            comp_matching_objs: list[Object] = obj_index.startswith(current_name)
             if len(comp_matching_objs) == 0 and component["draw_vb"] != "":
                 continue
             for j, part in enumerate(component["object_classifications"]):
@@ -204,9 +258,7 @@ class ModExporter:
                                 "diffuseguide",
                             ]
                         ]
-                matching_objs: list[Object] = [
-                    obj for obj in candidate_objs if obj.name.startswith(part_name)
-                ]
+                matching_objs: list[Object] = obj_index.startswith(part_name)
                 if component["draw_vb"] != "":
                     if not matching_objs:
                         raise Fatal(f"Cannot find object {part_name} in the scene.")
@@ -215,11 +267,7 @@ class ModExporter:
                             f"Found multiple objects with the name {part_name}."
                         )
                     obj: Object = matching_objs[0]
-                    collection = [
-                        c
-                        for c in bpy.data.collections
-                        if c.name.lower().startswith((part_name).lower())
-                    ]
+                    collection = col_index.startswith(part_name.lower())
                     if len(collection) > 1:
                         raise Fatal(
                             f"ERROR: Found multiple collections with the name {part_name}. Ensure only one collection exists with that name."
@@ -258,8 +306,7 @@ class ModExporter:
         if self.ignore_hidden:
             objs = [obj for obj in objs if obj.visible_get()]
         if self.only_selected:
-            selected_objs = [obj for obj in bpy.context.selected_objects]
-            objs = [obj for obj in objs if obj in selected_objs]
+            objs = [obj for obj in objs if obj in self.__selected_objs]
         sorted_objs = sorted(objs, key=lambda x: x.name)
         for obj in sorted_objs:
             final_mesh = self.process_mesh(main_obj, obj)
@@ -285,14 +332,7 @@ class ModExporter:
             final_mesh.transform(main_obj.matrix_world.inverted())
         # Triangulation is now handled inside get_loop_data via mesh.calc_loop_triangles(),
         # which avoids the expensive BMesh round-trip (bm.from_mesh + triangulate + bm.to_mesh).
-        masked_vgs = {
-            vg.index for vg in obj.vertex_groups if vg.name.startswith("MASK")
-        }
-        if masked_vgs:
-            for vert in final_mesh.vertices:
-                for vg in vert.groups:
-                    if vg.group in masked_vgs:
-                        vg.weight = 0.0
+        # MASK* vertex groups are zeroed in the blend stage of get_vertex_data.
         self.__objs_to_cleanup.append(obj)
         return final_mesh
 
@@ -300,6 +340,9 @@ class ModExporter:
         """Generate buffers for the objects."""
         self.files_to_write = {}
         self.files_to_copy = {}
+        DataModelXXMI.data_extractor.tangent_cache.cache_dir = (
+            self.cache_dir(TANGENT_CACHE_DIR) if self.tangent_cache_to_disk else None
+        )
         for component in self.mod_file.components:
             if component.draw_vb == "":
                 for part in component.parts:
@@ -361,6 +404,7 @@ class ModExporter:
                         entry.mesh,
                         excluded_buffers,
                         data_model.mirror_mesh,
+                        self.fill_vertex_groups,
                     )
                     gen_buffers["IB"].data["INDEX"] += vb_offset
                     for k, v in out_buffers.items():
@@ -383,7 +427,7 @@ class ModExporter:
                     part_ib.data
                 )
             if self.outline_optimization:
-                self.optimize_outlines(out_buffers, component_ib)
+                self.optimize_outlines(out_buffers, component_ib, component.fullname)
             if component.blend_vb != "":
                 self.files_to_write[
                     self.destination / (component.fullname + "Position.buf")
@@ -510,16 +554,48 @@ class ModExporter:
         ini_body: str = str(ini_file)
         self.files_to_write[self.destination / (self.mod_name + ".ini")] = ini_body
 
-    def optimize_outlines(
-        self, output_buffs: dict[str, NumpyBuffer], ib_buf: NumpyBuffer
-    ) -> None:
-        """Optimize the outlines of the meshes with angle-weighted normal averaging."""
-
-        def unit_vector(vector: NDArray) -> NDArray:
-            """Normalize the input vector to unit length."""
-            norm = numpy.linalg.norm(vector, axis=1, keepdims=True)
-            norm = numpy.where(norm == 0, 1, norm)
-            return vector / norm
+    def cache_dir(self, name: str) -> Path:
+        """Cache folder for this mod outside of its output folder."""
+        destination: str = str(self.destination.resolve())
+        mod_key: str = hashlib.blake2b(destination.encode(), digest_size=8).hexdigest()
+        return Path(tempfile.gettempdir()) / CACHE_ROOT_DIR / mod_key / name
+
+    def outline_cache_key(self, position: NDArray, ib_data: NDArray) -> str:
+        """Fingerprint of everything the outline vectors depend on."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(numpy.ascontiguousarray(position).tobytes())
+        digest.update(numpy.ascontiguousarray(ib_data).tobytes())
+        digest.update(
+            f"v{OUTLINE_CACHE_VERSION}:{self.outline_rounding_precision}".encode()
+        )
+        return digest.hexdigest()
+
+    def load_outline_cache(self, cache_name: str, key: str) -> Optional[NDArray]:
+        """Return cached (outline vector, face normal) rows or None on a miss."""
+        cache_file: Path = self.cache_dir(OUTLINE_CACHE_DIR) / f"{cache_name}-{key}.npy"
+        if not cache_file.is_file():
+            return None
+        try:
+            return numpy.load(cache_file, allow_pickle=False)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable outline cache {cache_file.name}: {e}")
+            return None
+
+    def save_outline_cache(self, cache_name: str, key: str, data: NDArray) -> None:
+        """Store outline data for the component and drop its stale entries."""
+        cache_dir: Path = self.cache_dir(OUTLINE_CACHE_DIR)
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            for stale in cache_dir.glob(f"{cache_name}-*.npy"):
+                stale.unlink()
+            numpy.save(cache_dir / f"{cache_name}-{key}.npy", data)
+        except OSError as e:
+            print(f"Failed to write outline cache for {cache_name}: {e}")
+
+    def calc_outline_vectors(
+        self, position: NDArray, ib_data: NDArray
+    ) -> tuple[NDArray, NDArray]:
+        """Angle-weighted outline vectors and face normals for every vertex."""
 
         def calc_angle(edge_a: NDArray, edge_b: NDArray) -> NDArray:
             """Calculate the angle between two edges in radians."""
@@ -533,15 +609,7 @@ class ModExporter:
                 )
             )
 
-        pos_buf: NumpyBuffer = output_buffs["Position"]
-        if len(pos_buf) == 0:
-            return
-        tex_buf: NumpyBuffer = output_buffs["TexCoord"]
-        ib_data: NDArray = ib_buf.data["INDEX"]
-
-        start_time: int | float = time.time()
-
-        loops_coord: NDArray = pos_buf.data["POSITION"][ib_data, 0:3]
+        loops_coord: NDArray = position[ib_data, 0:3]
         triangles: NDArray = loops_coord.reshape(-1, 3, 3)
         edge0: NDArray = triangles[:, 1] - triangles[:, 2]
         edge1: NDArray = triangles[:, 2] - triangles[:, 0]
@@ -558,8 +626,12 @@ class ModExporter:
         loops_face_normal: NDArray = faces_normal.repeat(3, axis=0)
 
         verts_outline_vector: NDArray = numpy.zeros(
-            (len(pos_buf), 3), dtype=numpy.float32
+            (len(position), 3), dtype=numpy.float32
+        )
+        verts_face_normal: NDArray = numpy.zeros(
+            (len(position), 3), dtype=numpy.float32
         )
+        verts_face_normal[ib_data] = loops_face_normal
 
         loops_round_coord: NDArray = numpy.round(
             loops_coord, self.outline_rounding_precision
@@ -573,6 +645,7 @@ class ModExporter:
             return_index=True,
             return_inverse=True,
         )
+        u_inverse = u_inverse.reshape(-1)
 
         accumulated_normals: NDArray = numpy.zeros((len(u), 3), dtype=numpy.float32)
         # Use numpy.add.at to efficiently sum weighted normals for each unique vertex
@@ -586,6 +659,50 @@ class ModExporter:
             accumulated_normals,
         )
         verts_outline_vector[ib_data] = unit_vector(accumulated_normals[u_inverse])
+        return verts_outline_vector, verts_face_normal
+
+    def optimize_outlines(
+        self,
+        output_buffs: dict[str, NumpyBuffer],
+        ib_buf: NumpyBuffer,
+        cache_name: str = "",
+    ) -> None:
+        """Optimize the outlines of the meshes with angle-weighted normal averaging.
+
+        Results are cached per component in the temp folder, keyed by the
+        position data, the index buffer and the outline settings.
+        """
+
+        pos_buf: NumpyBuffer = output_buffs["Position"]
+        if len(pos_buf) == 0:
+            return
+        tex_buf: NumpyBuffer = output_buffs["TexCoord"]
+        ib_data: NDArray = ib_buf.data["INDEX"]
+
+        start_time: int | float = time.time()
+
+        position: NDArray = pos_buf.data["POSITION"]
+        use_cache: bool = self.outline_cache and cache_name != ""
+        cached: Optional[NDArray] = None
+        if use_cache:
+            cache_key: str = self.outline_cache_key(position, ib_data)
+            cached = self.load_outline_cache(cache_name, cache_key)
+            if cached is not None and cached.shape != (len(pos_buf), 6):
+                cached = None
+        if cached is not None:
+            print(f"Using cached outlines for {cache_name}")
+            verts_outline_vector: NDArray = cached[:, 0:3]
+            verts_face_normal: NDArray = cached[:, 3:6]
+        else:
+            verts_outline_vector, verts_face_normal = self.calc_outline_vectors(
+                position, ib_data
+            )
+            if use_cache:
+                self.save_outline_cache(
+                    cache_name,
+                    cache_key,
+                    numpy.hstack((verts_outline_vector, verts_face_normal)),
+                )
 
         if self.game in [
             GameEnum.GenshinImpact,
@@ -626,8 +743,7 @@ class ModExporter:
                 )
                 pos_buf.data["COLOR"][:, 3] = copy[:, 3]
         elif self.game == GameEnum.ZenlessZoneZero:
-            norm: NDArray = numpy.empty_like(verts_outline_vector)
-            norm[ib_data] = loops_face_normal
+            norm: NDArray = verts_face_normal
             tan: NDArray = unit_vector(pos_buf.data["TANGENT"])
             bitan: NDArray = numpy.cross(norm, tan)
             texcoord1_element = tex_buf.layout.get_element(
@@ -0,0 +1,183 @@
+"""
+XXMI Tools CHN — 顶点组重心匹配引擎
+==========================================
+两步完成顶点组匹配：
+1. 用 mathutils.kdtree.KDTree 为每个目标重心筛选候选源重心；
+2. 按候选图的连通分量拆分，在每个分量的代价矩阵上用
+   最短增广路（Jonker-Volgenant 风格的匈牙利算法）求全局最优一一匹配。
+
+与逐个贪心取最近的做法不同，结果与顶点组的遍历顺序无关。
+"""
+
+import numpy as np
+from mathutils.kdtree import KDTree
+
+
+# ============================================================
+# 指派问题求解
+# ============================================================
+
+def linear_sum_assignment(cost):
+    """
+    求解矩形代价矩阵的最小代价指派，返回 (行索引, 列索引)，按行升序。
+    代价必须为有限值；不允许的配对请用足够大的惩罚值代替。
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    # 对偶变量 u/v 满足 cost[i, j] - u[i] - v[j] >= 0，已匹配的边取等号
+    u = np.zeros(n)
+    v = np.zeros(m)
+    col4row = np.full(n, -1, dtype=np.int64)
+    row4col = np.full(m, -1, dtype=np.int64)
+
+    # 行归约初始化：u 取每行最小值，各行先占用自己的最小列（列未被占用时），
+    # v 保持 0，只需对剩下的行做增广
+    best_cols = np.argmin(cost, axis=1)
+    u[:] = cost[np.arange(n), best_cols]
+    pending = []
+    for i in range(n):
+        j = best_cols[i]
+        if row4col[j] == -1:
+            row4col[j] = i
+            col4row[i] = j
+        else:
+            pending.append(i)
+
+    for cur_row in pending:
+        # 从 cur_row 出发按约减代价做 Dijkstra，直到到达空闲列。
+        # 已扫描的列在 open_v 中记为 -inf，使其约减代价恒为 +inf 不再被更新
+        open_dist = np.full(m, np.inf)
+        open_v = v.copy()
+        scanned_dist = np.zeros(m)
+        path = np.full(m, -1, dtype=np.int64)
+        scanned = []
+        min_val = 0.0
+        i = cur_row
+        while True:
+            reduced = (cost[i] - (u[i] - min_val)) - open_v
+            better = reduced < open_dist
+            open_dist[better] = reduced[better]
+            path[better] = i
+            j = int(np.argmin(open_dist))
+            min_val = open_dist[j]
+            scanned_dist[j] = min_val
+            open_dist[j] = np.inf
+            open_v[j] = -np.inf
+            if row4col[j] == -1:
+                sink = j
+                break
+            scanned.append(j)
+            i = row4col[j]
+
+        # 一次性更新路径上的对偶变量
+        u[cur_row] += min_val
+        if scanned:
+            scanned = np.array(scanned, dtype=np.int64)
+            delta = min_val - scanned_dist[scanned]
+            u[row4col[scanned]] += delta
+            v[scanned] -= delta
+
+        # 沿增广路翻转匹配
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == cur_row:
+                break
+
+    rows = np.arange(n)
+    cols = col4row
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+
+def _connected_components(num_rows, num_cols, edges):
+    """并查集求二分候选图的连通分量，返回 [(行列表, 列列表), ...]"""
+    parent = list(range(num_rows + num_cols))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for r, c in edges:
+        a, b = find(r), find(num_rows + c)
+        if a != b:
+            parent[a] = b
+
+    groups = {}
+    for r, _ in edges:
+        groups.setdefault(find(r), (set(), set()))[0].add(r)
+    for _, c in edges:
+        groups[find(num_rows + c)][1].add(c)
+    return [(sorted(rs), sorted(cs)) for rs, cs in groups.values()]
+
+
+# ============================================================
+# 重心匹配
+# ============================================================
+
+def match_centers(src_centers, tgt_centers, threshold=None, k=8):
+    """
+    src_centers / tgt_centers: {顶点组名: Vector}
+    threshold: 最大匹配距离；None 表示不限距离，只取 k 个最近的候选
+    返回 (matches {tgt_name: src_name}, unmatched [(tgt_name, 最近距离)])
+    """
+    src_names = list(src_centers)
+    tgt_names = list(tgt_centers)
+    if not tgt_names:
+        return {}, []
+    if not src_names:
+        return {}, [(name, float('inf')) for name in tgt_names]
+
+    tree = KDTree(len(src_names))
+    for i, name in enumerate(src_names):
+        tree.insert(src_centers[name], i)
+    tree.balance()
+
+    # 1. KD 树筛选候选
+    edges = {}
+    nearest = []
+    for r, name in enumerate(tgt_names):
+        co = tgt_centers[name]
+        _, _, dist = tree.find(co)
+        nearest.append(dist)
+        if threshold is None:
+            found = tree.find_n(co, min(k, len(src_names)))
+        else:
+            found = tree.find_range(co, threshold)
+        for _, c, d in found:
+            edges[(r, c)] = d
+
+    # 2. 逐个连通分量求全局最优指派
+    matches = {}
+    for rows, cols in _connected_components(len(tgt_names), len(src_names), edges):
+        col_pos = {c: j for j, c in enumerate(cols)}
+        block = np.full((len(rows), len(cols)), np.nan)
+        for i, r in enumerate(rows):
+            for c in cols:
+                d = edges.get((r, c))
+                if d is not None:
+                    block[i, col_pos[c]] = d
+        allowed = ~np.isnan(block)
+        # 非候选配对给一个大于任何合法方案总代价的惩罚
+        penalty = (np.nanmax(block) + 1.0) * (min(block.shape) + 1)
+        block[~allowed] = penalty
+        for i, j in zip(*linear_sum_assignment(block)):
+            if allowed[i, j]:
+                matches[tgt_names[rows[i]]] = src_names[cols[j]]
+
+    unmatched = [(name, nearest[r]) for r, name in enumerate(tgt_names) if name not in matches]
+    return matches, unmatched
@@ -2,7 +2,6 @@ import itertools
 import os
 import struct
 
-import re
 import numpy
 from pathlib import Path
 from typing import Callable
@@ -36,6 +35,7 @@ from .datahandling import (
 )
 from .datastructures import (
     Fatal,
+    FrameAnalysisCatalog,
     ImportPaths,
     IOOBJOrientationHelper,
     VBSOMapEntry,
@@ -139,6 +139,7 @@ def import_normals_step1(
     operator: Operator,
     translate_normal: Callable,
     flip_mesh: bool,
+    loop_source=None,
 ):
     # Ensure normals are 3-dimensional:
     # XXX: Assertion triggers in DOA6
@@ -167,8 +168,12 @@ def import_normals_step1(
     if bpy.app.version >= (4, 1):
         return normals
     mesh.create_normals_split()
-    for loop in mesh.loops:
-        loop.normal[:] = normals[loop.vertex_index]
+    if loop_source is None:
+        for loop in mesh.loops:
+            loop.normal[:] = normals[loop.vertex_index]
+    else:
+        for loop in mesh.loops:
+            loop.normal[:] = normals[loop_source[loop.index]]
     return []
 
 
@@ -188,6 +193,56 @@ def import_normals_step2(mesh: Mesh):
     # mesh.show_edge_sharp = True
 
 
+def mark_sharp_edges_from_normals(mesh: Mesh):
+    """
+    Mark every edge sharp where the custom normals of the faces on either side
+    of it differ, the same thing remove_doubles(use_sharp_edge_from_normals=True)
+    does. Needed when the vertices were merged by preweld_mesh() so that
+    tris_convert_to_quads(sharp=True) still respects the normal seams.
+    """
+    if bpy.app.version >= (4, 1):
+        loop_normals, normals_attr = mesh.corner_normals, "vector"
+    else:
+        mesh.calc_normals_split()
+        loop_normals, normals_attr = mesh.loops, "normal"
+    num_loops = len(mesh.loops)
+    clnors = numpy.empty(num_loops * 3, dtype=numpy.float32)
+    loop_normals.foreach_get(normals_attr, clnors)
+    clnors = clnors.reshape(-1, 3)
+    loop_vert = numpy.empty(num_loops, dtype=numpy.int64)
+    loop_edge = numpy.empty(num_loops, dtype=numpy.int64)
+    mesh.loops.foreach_get("vertex_index", loop_vert)
+    mesh.loops.foreach_get("edge_index", loop_edge)
+    loop_start = numpy.empty(len(mesh.polygons), dtype=numpy.int64)
+    loop_total = numpy.empty(len(mesh.polygons), dtype=numpy.int64)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+
+    # Each loop's edge runs to the next loop of the same face, so every face
+    # sees both ends of the edge with its own normal at each of them:
+    next_loop = numpy.arange(1, num_loops + 1)
+    last_loop = loop_start + loop_total - 1
+    next_loop[last_loop] = loop_start
+    edge = numpy.concatenate((loop_edge, loop_edge))
+    vert = numpy.concatenate((loop_vert, loop_vert[next_loop]))
+    corner = numpy.concatenate((numpy.arange(num_loops), next_loop))
+
+    # Compare the normal every face uses at an edge's end point against the
+    # first one found. Same threshold Blender uses for custom normal spaces:
+    order = numpy.lexsort((vert, edge))
+    edge, vert, corner = edge[order], vert[order], corner[order]
+    group_start = numpy.ones(len(edge), dtype=bool)
+    group_start[1:] = (edge[1:] != edge[:-1]) | (vert[1:] != vert[:-1])
+    first_corner = corner[group_start][numpy.cumsum(group_start) - 1]
+    dots = numpy.einsum("ij,ij->i", clnors[corner], clnors[first_corner])
+    sharp = numpy.zeros(len(mesh.edges), dtype=bool)
+    sharp[edge[dots < 1.0 - 1e-4]] = True
+    if sharp.any():
+        existing = numpy.empty(len(mesh.edges), dtype=bool)
+        mesh.edges.foreach_get("use_edge_sharp", existing)
+        mesh.edges.foreach_set("use_edge_sharp", sharp | existing)
+
+
 def import_vertex_groups(mesh: Mesh, obj: Object, blend_indices, blend_weights):
     # assert len(blend_indices) == len(blend_weights), (
     #     "Mismatched blend indices and weights"
@@ -219,7 +274,12 @@ def import_vertex_groups(mesh: Mesh, obj: Object, blend_indices, blend_weights):
                     obj.vertex_groups[i].add((vertex.index,), w, "REPLACE")
 
 
-def import_uv_layers(mesh: Mesh, obj: Object, texcoords, flip_texcoord_v: bool):
+def import_uv_layers(
+    mesh: Mesh, obj: Object, texcoords, flip_texcoord_v: bool, loop_source=None
+):
+    if texcoords and loop_source is None:
+        loop_source = numpy.empty(len(mesh.loops), dtype=numpy.int64)
+        mesh.loops.foreach_get("vertex_index", loop_source)
     for texcoord, data in sorted(texcoords.items()):
         # TEXCOORDS can have up to four components, but UVs can only have two
         # dimensions. Not positive of the best way to handle this in general,
@@ -270,9 +330,11 @@ def import_uv_layers(mesh: Mesh, obj: Object, texcoords, flip_texcoord_v: bool):
             else:
                 translate_uv = lambda uv: uv
 
-            uvs = [[d[cmap[c]] for c in components] for d in data]
-            for loop in mesh.loops:
-                blender_uvs.data[loop.index].uv = translate_uv(uvs[loop.vertex_index])
+            uvs = numpy.array(
+                [translate_uv([d[cmap[c]] for c in components]) for d in data],
+                dtype=numpy.float32,
+            )
+            blender_uvs.data.foreach_set("uv", uvs[loop_source].ravel())
 
 
 # This loads unknown data from the vertex buffers as vertex layers
@@ -318,6 +380,16 @@ def import_faces_from_ib(mesh: Mesh, ib: IndexBuffer, flip_winding: bool):
     mesh.polygons.foreach_set("loop_total", [3] * len(ib.faces))
 
 
+def import_faces_from_array(mesh: Mesh, faces):
+    mesh.loops.add(faces.size)
+    mesh.polygons.add(len(faces))
+    mesh.loops.foreach_set("vertex_index", faces.astype(numpy.int32).ravel())
+    mesh.polygons.foreach_set(
+        "loop_start", numpy.arange(0, faces.size, 3, dtype=numpy.int32)
+    )
+    mesh.polygons.foreach_set("loop_total", numpy.full(len(faces), 3, numpy.int32))
+
+
 def import_faces_from_vb_trianglelist(
     mesh: Mesh, vb: VertexBufferGroup, flip_winding: bool
 ):
@@ -376,8 +448,18 @@ def import_vertices(
     semantic_translations={},
     flip_normal: bool = False,
     flip_mesh: bool = False,
+    vertex_source=None,
+    loop_source=None,
 ):
-    mesh.vertices.add(len(vb.vertices))
+    # vertex_source / loop_source come from preweld_mesh(): the original
+    # vertex each mesh vertex and each loop takes its data from. Per vertex
+    # data (positions, weights, vertex layers) follows vertex_source while
+    # per loop data (colors, normals, and UVs later on) follows loop_source,
+    # so seams survive welding just as they do with remove_doubles.
+    if vertex_source is None:
+        mesh.vertices.add(len(vb.vertices))
+    else:
+        mesh.vertices.add(len(vertex_source))
 
     blend_indices = {}
     blend_weights = {}
@@ -429,31 +511,48 @@ def import_vertices(
                     )
                     vertex_layers["POSITION.w"] = [[x[3]] for x in data]
             positions = [(-(2 * flip_mesh - 1) * x[0], x[1], x[2]) for x in data]
+            if vertex_source is not None:
+                positions = [positions[i] for i in vertex_source]
             mesh.vertices.foreach_set("co", unpack_list(positions))
         elif translated_elem_name.startswith("COLOR"):
+            if loop_source is None:
+                loop_vertex_ids = numpy.empty(len(mesh.loops), dtype=numpy.int64)
+                mesh.loops.foreach_get("vertex_index", loop_vertex_ids)
+            else:
+                loop_vertex_ids = loop_source
             if len(data[0]) <= 3 or vertex_color_layer_channels == 4:
                 # Either a monochrome/RGB layer, or Blender 2.80 which uses 4
                 # channel layers
                 mesh.vertex_colors.new(name=elem.name)
                 color_layer = mesh.vertex_colors[elem.name].data
                 c = vertex_color_layer_channels
-                for loop in mesh.loops:
-                    color_layer[loop.index].color = list(data[loop.vertex_index]) + [
-                        0
-                    ] * (c - len(data[loop.vertex_index]))
+                # Pad missing channels with zeros, then expand per loop
+                colors = numpy.zeros((len(data), c), dtype=numpy.float32)
+                colors[:, : len(data[0])] = data
+                color_layer.foreach_set("color", colors[loop_vertex_ids].ravel())
             else:
                 mesh.vertex_colors.new(name=elem.name + ".RGB")
                 mesh.vertex_colors.new(name=elem.name + ".A")
                 color_layer = mesh.vertex_colors[elem.name + ".RGB"].data
                 alpha_layer = mesh.vertex_colors[elem.name + ".A"].data
-                for loop in mesh.loops:
-                    color_layer[loop.index].color = data[loop.vertex_index][:3]
-                    alpha_layer[loop.index].color = [data[loop.vertex_index][3], 0, 0]
+                colors = numpy.asarray(data, dtype=numpy.float32)
+                alpha = numpy.zeros((len(data), 3), dtype=numpy.float32)
+                alpha[:, 0] = colors[:, 3]
+                color_layer.foreach_set(
+                    "color", colors[loop_vertex_ids, :3].ravel()
+                )
+                alpha_layer.foreach_set("color", alpha[loop_vertex_ids].ravel())
         elif translated_elem_name == "NORMAL":
             use_normals = True
             translate_normal = normal_import_translation(elem, flip_normal)
             normals = import_normals_step1(
-                mesh, data, vertex_layers, operator, translate_normal, flip_mesh
+                mesh,
+                data,
+                vertex_layers,
+                operator,
+                translate_normal,
+                flip_mesh,
+                loop_source,
             )
         elif translated_elem_name in ("TANGENT", "BINORMAL"):
             #    # XXX: loops.tangent is read only. Not positive how to handle
@@ -481,6 +580,11 @@ def import_vertices(
             )
             vertex_layers[elem.name] = data
 
+    if vertex_source is not None:
+        for per_vertex in (blend_indices, blend_weights, vertex_layers):
+            for key, data in per_vertex.items():
+                per_vertex[key] = [data[i] for i in vertex_source]
+
     return (
         blend_indices,
         blend_weights,
@@ -491,6 +595,209 @@ def import_vertices(
     )
 
 
+# Same default merge distance as bpy.ops.mesh.remove_doubles
+MERGE_DISTANCE = 0.0001
+PREWELD_NORMALS_ATTR = "3DMigoto:PreweldNormals"
+
+
+# Spatial hash of a grid cell, chosen so hash(cell + offset) is just
+# hash(cell) + hash(offset), even once the products wrap around
+CELL_HASH = numpy.array([73856093, 19349663, 83492791], dtype=numpy.int64)
+# The cell itself and half of its 26 neighbours, so every pair of adjacent
+# cells is visited exactly once
+CELL_NEIGHBOURS = [
+    (x, y, z)
+    for x in (-1, 0, 1)
+    for y in (-1, 0, 1)
+    for z in (-1, 0, 1)
+    if (x, y, z) >= (0, 0, 0)
+]
+
+
+def close_pairs(points, distance):
+    """
+    All pairs (i, j), i < j, of points closer than distance. The points are
+    hashed into a grid of distance sized cells so only points in the same or
+    adjacent cells are compared. Hash collisions only add candidates that
+    the distance check then rejects.
+    """
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        keys = numpy.floor(points / distance).astype(numpy.int64) @ CELL_HASH
+    order = numpy.argsort(keys, kind="stable")
+    buckets, starts, counts = numpy.unique(
+        keys[order], return_index=True, return_counts=True
+    )
+    distance_sq = distance * distance
+    pairs_i, pairs_j = [], []
+    for offset in CELL_NEIGHBOURS:
+        with numpy.errstate(over="ignore"):
+            neighbours = buckets + numpy.array(offset, dtype=numpy.int64) @ CELL_HASH
+        pos = numpy.minimum(numpy.searchsorted(buckets, neighbours), len(buckets) - 1)
+        a = numpy.flatnonzero(buckets[pos] == neighbours)
+        b = pos[a]
+        if offset == (0, 0, 0):
+            a = a[counts[a] > 1]
+            b = a
+        # Expand each pair of buckets into every pair of their points:
+        total = counts[a] * counts[b]
+        bucket_pair = numpy.repeat(numpy.arange(len(a)), total)
+        k = numpy.arange(total.sum()) - numpy.repeat(numpy.cumsum(total) - total, total)
+        i = order[starts[a][bucket_pair] + k // counts[b][bucket_pair]]
+        j = order[starts[b][bucket_pair] + k % counts[b][bucket_pair]]
+        delta = points[j] - points[i]
+        close = (i != j) & (numpy.einsum("ij,ij->i", delta, delta) <= distance_sq)
+        pairs_i.append(numpy.minimum(i[close], j[close]))
+        pairs_j.append(numpy.maximum(i[close], j[close]))
+    return numpy.concatenate(pairs_i), numpy.concatenate(pairs_j)
+
+
+def weld_targets(positions, distance=MERGE_DISTANCE):
+    """
+    For every vertex, find the vertex it is merged into when welding
+    vertices closer than distance (itself if it is kept). Exact duplicates
+    are collapsed with a single numpy.unique first. Each remaining vertex
+    then merges into the lowest numbered vertex close enough to it that was
+    not merged itself, which is resolved in vectorized rounds rather than
+    one vertex at a time.
+    """
+    positions = numpy.asarray(positions, dtype=numpy.float64)
+    unique, first, inverse = numpy.unique(
+        positions, axis=0, return_index=True, return_inverse=True
+    )
+    # Number the unique positions in the order the vertices use them:
+    order = numpy.argsort(first, kind="stable")
+    unique, first = unique[order], first[order]
+    renumber = numpy.empty_like(order)
+    renumber[order] = numpy.arange(len(order))
+    inverse = renumber[inverse.reshape(-1)]
+
+    leader = numpy.arange(len(unique))
+    if distance > 0 and len(unique) > 1:
+        pairs_i, pairs_j = close_pairs(unique, distance)
+        # -1 while the vertex still depends on lower numbered vertices that
+        # are not resolved yet:
+        leader[pairs_j] = -1
+        while len(pairs_j):
+            # Vertices that were merged themselves can't take any others:
+            candidates = numpy.where(
+                (leader[pairs_i] == -1) | (leader[pairs_i] == pairs_i),
+                pairs_i,
+                len(unique),
+            )
+            nearest = numpy.full(len(unique), len(unique), dtype=numpy.int64)
+            numpy.minimum.at(nearest, pairs_j, candidates)
+            pending = numpy.unique(pairs_j)
+            # The first candidate decides: merge into it once it is known to
+            # be kept, keep the vertex if no candidate is left.
+            nearest = nearest[pending]
+            no_candidate = nearest == len(unique)
+            leader[pending[no_candidate]] = pending[no_candidate]
+            nearest_kept = ~no_candidate
+            nearest_kept[nearest_kept] = (
+                leader[nearest[nearest_kept]] == nearest[nearest_kept]
+            )
+            leader[pending[nearest_kept]] = nearest[nearest_kept]
+            unresolved = leader[pairs_j] == -1
+            pairs_i, pairs_j = pairs_i[unresolved], pairs_j[unresolved]
+    return first[leader[inverse]]
+
+
+def preweld_mesh(
+    positions, faces, merge_distance=None, attribute_keys=None, remove_loose=False
+):
+    """
+    Clean up triangle data before it is handed to Blender, replacing the
+    remove_doubles and delete_loose edit mode operators:
+
+    - Weld vertices closer than merge_distance (None to skip welding). When
+      attribute_keys is given, vertices are only welded if their rows in it
+      also match, which keeps UV and normal seams split.
+    - Drop triangles that collapsed and triangles reusing the vertices of an
+      earlier triangle (which Mesh.validate() would remove anyway).
+    - Drop vertices no triangle uses if remove_loose is set, and compact the
+      remaining vertices keeping their original order.
+
+    Returns (vertex_source, faces, loop_source): the original index of each
+    kept vertex, the triangles in the new numbering, and the original vertex
+    of each triangle corner, to look per loop data up from.
+    """
+    faces = numpy.asarray(faces, dtype=numpy.int64).reshape(-1, 3)
+    num_vertices = len(positions)
+    if merge_distance is not None:
+        target = weld_targets(positions, merge_distance)
+        if attribute_keys is not None:
+            _, first, inverse = numpy.unique(
+                numpy.column_stack((target, attribute_keys)),
+                axis=0,
+                return_index=True,
+                return_inverse=True,
+            )
+            target = first[inverse.reshape(-1)]
+    else:
+        target = numpy.arange(num_vertices)
+    welded = target[faces]
+
+    keep = (
+        (welded[:, 0] != welded[:, 1])
+        & (welded[:, 1] != welded[:, 2])
+        & (welded[:, 0] != welded[:, 2])
+    )
+    if keep.any():
+        candidates = numpy.flatnonzero(keep)
+        corners = numpy.sort(welded[candidates], axis=1)
+        if num_vertices < 1 << 21:
+            # Pack the three corners into one key, much faster to unique:
+            corners = (corners[:, 0] << 42) | (corners[:, 1] << 21) | corners[:, 2]
+        _, first_face = numpy.unique(corners, axis=0, return_index=True)
+        keep[:] = False
+        keep[candidates[first_face]] = True
+    welded = welded[keep]
+
+    if remove_loose:
+        vertex_source = numpy.unique(welded)
+    else:
+        vertex_source = numpy.unique(target)
+    remap = numpy.full(num_vertices, -1, dtype=numpy.int64)
+    remap[vertex_source] = numpy.arange(len(vertex_source))
+    return vertex_source, remap[welded], faces[keep]
+
+
+def preweld_source_faces(vb: VertexBufferGroup, ib: IndexBuffer, flip_winding: bool):
+    """Triangles to preweld, or None to leave the mesh to the edit mode path"""
+    if ib is not None:
+        if ib.topology not in ("trianglelist", "trianglestrip") or not ib.faces:
+            return None
+        faces = numpy.array(ib.faces, dtype=numpy.int64)
+    elif vb.topology == "trianglelist" and not flip_winding:
+        faces = numpy.arange(len(vb.vertices) // 3 * 3, dtype=numpy.int64)
+    else:
+        return None
+    faces = faces.reshape(-1, 3)
+    if faces.size == 0 or faces.min() < 0 or faces.max() >= len(vb.vertices):
+        return None
+    return faces
+
+
+def preweld_vertex_data(vb: VertexBufferGroup, semantic_translations, semantics):
+    """Stack the per vertex elements whose translated name is in semantics"""
+    columns = []
+    for elem in vb.layout:
+        if elem.InputSlotClass != "per-vertex" or elem.reused_offset:
+            continue
+        if elem.InputSlot not in vb.slots:
+            continue
+        translated_elem_name = semantic_translations.get(
+            elem.name, (elem.name, elem.SemanticIndex)
+        )[0].upper()
+        if translated_elem_name.rstrip("0123456789") not in semantics:
+            continue
+        data = numpy.array([x[elem.name] for x in vb.vertices], dtype=numpy.float64)
+        columns.append(data.reshape(len(vb.vertices), -1))
+    if not columns:
+        return None
+    return numpy.column_stack(columns)
+
+
 def import_3dmigoto_vb_ib(
     operator: Operator,
     context: Context,
@@ -504,6 +811,7 @@ def import_3dmigoto_vb_ib(
     pose_cb_off=[0, 0],
     pose_cb_step=1,
     merge_verts: bool = False,
+    merge_verts_keep_seams: bool = False,
     tris_to_quads: bool = False,
     clean_loose: bool = False,
 ):
@@ -536,7 +844,36 @@ def import_3dmigoto_vb_ib(
     if flip_mesh:
         flip_winding = not flip_winding
 
-    if ib is not None:
+    # Merge and clean up the triangles in numpy before the mesh is created
+    # where possible, rather than round tripping through edit mode after:
+    vertex_source = loop_source = None
+    if merge_verts or clean_loose:
+        faces = preweld_source_faces(vb, ib, flip_winding)
+        positions = preweld_vertex_data(vb, semantic_translations, ("POSITION",))
+        if faces is not None and positions is not None:
+            attribute_keys = None
+            if merge_verts and merge_verts_keep_seams:
+                attribute_keys = preweld_vertex_data(
+                    vb, semantic_translations, ("NORMAL", "TEXCOORD")
+                )
+            vertex_source, faces, loop_source = preweld_mesh(
+                positions[:, :3],
+                faces,
+                merge_distance=MERGE_DISTANCE if merge_verts else None,
+                attribute_keys=attribute_keys,
+                remove_loose=clean_loose,
+            )
+            if flip_winding:
+                faces = faces[:, ::-1]
+                loop_source = loop_source[:, ::-1]
+            loop_source = loop_source.ravel()
+
+    if vertex_source is not None:
+        import_faces_from_array(mesh, faces)
+        if ib is not None:
+            obj["3DMigoto:IBFormat"] = ib.format
+            obj["3DMigoto:FirstIndex"] = ib.first
+    elif ib is not None:
         if ib.topology in ("trianglelist", "trianglestrip"):
             import_faces_from_ib(mesh, ib, flip_winding)
         elif ib.topology == "pointlist":
@@ -562,11 +899,19 @@ def import_3dmigoto_vb_ib(
 
     (blend_indices, blend_weights, texcoords, vertex_layers, use_normals, normals) = (
         import_vertices(
-            mesh, obj, vb, operator, semantic_translations, flip_normal, flip_mesh
+            mesh,
+            obj,
+            vb,
+            operator,
+            semantic_translations,
+            flip_normal,
+            flip_mesh,
+            vertex_source,
+            loop_source,
         )
     )
 
-    import_uv_layers(mesh, obj, texcoords, flip_texcoord_v)
+    import_uv_layers(mesh, obj, texcoords, flip_texcoord_v, loop_source)
     if not texcoords:
         operator.report(
             {"WARNING"},
@@ -579,6 +924,16 @@ def import_3dmigoto_vb_ib(
 
     import_vertex_groups(mesh, obj, blend_indices, blend_weights)
 
+    if use_normals and loop_source is not None and bpy.app.version >= (4, 1):
+        # Welded vertices no longer have a single normal, so carry the per
+        # loop normals through validate() in a temporary corner attribute:
+        normals_attr = mesh.attributes.new(
+            name=PREWELD_NORMALS_ATTR, type="FLOAT_VECTOR", domain="CORNER"
+        )
+        normals_attr.data.foreach_set(
+            "vector", numpy.asarray(normals, dtype=numpy.float32)[loop_source].ravel()
+        )
+
     # Validate closes the loops so they don't disappear after edit mode and probably other important things:
     mesh.validate(
         verbose=False, clean_customdata=False
@@ -588,7 +943,12 @@ def import_3dmigoto_vb_ib(
 
     # Must be done after validate step:
     if use_normals:
-        if bpy.app.version >= (4, 1):
+        if bpy.app.version >= (4, 1) and loop_source is not None:
+            clnors = numpy.empty(len(mesh.loops) * 3, dtype=numpy.float32)
+            mesh.attributes[PREWELD_NORMALS_ATTR].data.foreach_get("vector", clnors)
+            mesh.attributes.remove(mesh.attributes[PREWELD_NORMALS_ATTR])
+            mesh.normals_split_custom_set(clnors.reshape(-1, 3))
+        elif bpy.app.version >= (4, 1):
             mesh.normals_split_custom_set_from_vertices(normals)
         else:
             import_normals_step2(mesh)
@@ -599,17 +959,23 @@ def import_3dmigoto_vb_ib(
     obj.select_set(True)
     context.view_layer.objects.active = obj
 
-    bpy.ops.object.mode_set(mode="EDIT")
-    bpy.ops.mesh.select_all(action="SELECT")
-    if merge_verts:
-        bpy.ops.mesh.remove_doubles(use_sharp_edge_from_normals=True)
-    if tris_to_quads:
-        bpy.ops.mesh.tris_convert_to_quads(
-            uvs=True, vcols=True, seam=True, sharp=True, materials=True
-        )
-    if clean_loose:
-        bpy.ops.mesh.delete_loose()
-    bpy.ops.object.mode_set(mode="OBJECT")
+    # Merging and loose geometry were already handled by preweld_mesh() if
+    # it ran, only fall back to the edit mode operators for what is left:
+    prewelded = vertex_source is not None
+    if prewelded and merge_verts and use_normals:
+        mark_sharp_edges_from_normals(mesh)
+    if tris_to_quads or (not prewelded and (merge_verts or clean_loose)):
+        bpy.ops.object.mode_set(mode="EDIT")
+        bpy.ops.mesh.select_all(action="SELECT")
+        if merge_verts and not prewelded:
+            bpy.ops.mesh.remove_doubles(use_sharp_edge_from_normals=True)
+        if tris_to_quads:
+            bpy.ops.mesh.tris_convert_to_quads(
+                uvs=True, vcols=True, seam=True, sharp=True, materials=True
+            )
+        if clean_loose and not prewelded:
+            bpy.ops.mesh.delete_loose()
+        bpy.ops.object.mode_set(mode="OBJECT")
     if pose_path is not None:
         import_pose(
             operator,
@@ -902,6 +1268,11 @@ class Import3DMigotoFrameAnalysis(Operator, ImportHelper, IOOBJOrientationHelper
         description="Merge by distance to remove duplicate vertices",
         default=False,
     )
+    merge_verts_keep_seams: BoolProperty(
+        name="Keep UV/Normal Seams",
+        description="Only merge vertices whose normals and UVs match as well, keeping seams split",
+        default=False,
+    )
     tris_to_quads: BoolProperty(
         name="Tris to Quads",
         description="Convert all tris to quads",
@@ -914,14 +1285,10 @@ class Import3DMigotoFrameAnalysis(Operator, ImportHelper, IOOBJOrientationHelper
     )
 
     def get_vb_ib_paths(self, load_related=None):
-        buffer_pattern = re.compile(
-            r"""-(?:ib|vb[0-9]+)(?P<hash>=[0-9a-f]+)?(?=[^0-9a-f=])"""
-        )
-        vb_regex = re.compile(
-            r"""^(?P<draw_call>[0-9]+)-vb(?P<slot>[0-9]+)="""
-        )  # TODO: Combine with above? (careful not to break hold type frame analysis)
+        buffer_pattern = FrameAnalysisCatalog.buffer_pattern
 
         dirname = os.path.dirname(self.filepath)
+        catalog = FrameAnalysisCatalog.from_dir(dirname)
         ret = set()
         if load_related is None:
             load_related = self.load_related
@@ -941,15 +1308,7 @@ class Import3DMigotoFrameAnalysis(Operator, ImportHelper, IOOBJOrientationHelper
         files = set()
         if load_related:
             for filename in self.files:
-                match = buffer_pattern.search(filename.name)
-                if match is None or not match.group("hash"):
-                    continue
-                paths = glob(
-                    os.path.join(
-                        dirname, "*%s*.txt" % filename.name[match.start() : match.end()]
-                    )
-                )
-                files.update([os.path.basename(x) for x in paths])
+                files.update(catalog.related_txt(filename.name))
         if not files:
             files = [x.name for x in self.files]
             if files == [""]:
@@ -991,31 +1350,31 @@ class Import3DMigotoFrameAnalysis(Operator, ImportHelper, IOOBJOrientationHelper
                 )
                 use_bin = True  # FIXME: Ask
 
-            ib_pattern = filename[: match.start()] + "-ib*" + filename[match.end() :]
-            vb_pattern = filename[: match.start()] + "-vb*" + filename[match.end() :]
-            ib_paths = glob(os.path.join(dirname, ib_pattern))
-            vb_paths = glob(os.path.join(dirname, vb_pattern))
-            done.update(map(os.path.basename, itertools.chain(vb_paths, ib_paths)))
+            ib_names, vb_names = catalog.sibling_buffers(filename)
+            done.update(vb_names)
+            done.update(ib_names)
+            ib_paths = list(map(catalog.path, ib_names))
+            vb_paths = list(map(catalog.path, vb_names))
 
             if vb_so_map:
                 vb_so_paths = set()
-                for vb_path in vb_paths:
-                    vb_match = vb_regex.match(os.path.basename(vb_path))
-                    if vb_match:
-                        draw_call, slot = map(int, vb_match.group("draw_call", "slot"))
-                        so = vb_so_map.get(VBSOMapEntry(draw_call, slot))
+                for vb_name in vb_names:
+                    vb_buffer = catalog.buffers[vb_name]
+                    if vb_buffer.draw_call is not None and vb_buffer.hash:
+                        so = vb_so_map.get(
+                            VBSOMapEntry(vb_buffer.draw_call, vb_buffer.slot)
+                        )
                         if so:
                             # No particularly good way to determine which input
                             # vertex buffers we need from the stream-output
                             # pass, so for now add them all:
-                            vb_so_pattern = f"{so.draw_call:06}-vb*.txt"
-                            glob_result = glob(os.path.join(dirname, vb_so_pattern))
-                            if not glob_result:
+                            so_names = catalog.vertex_buffer_txt(so.draw_call)
+                            if not so_names:
                                 self.report(
                                     {"WARNING"},
-                                    f"{vb_so_pattern} not found, loading unposed meshes from GPU Stream Output pre-skinning passes will be unavailable",
+                                    f"{so.draw_call:06}-vb*.txt not found, loading unposed meshes from GPU Stream Output pre-skinning passes will be unavailable",
                                 )
-                            vb_so_paths.update(glob_result)
+                            vb_so_paths.update(map(catalog.path, so_names))
                 # FIXME: Not sure yet whether the extra vertex buffers from the
                 # stream output pre-skinning passes are best lumped in with the
                 # existing vb_paths or added as a separate set of paths. Advantages
@@ -1027,7 +1386,7 @@ class Import3DMigotoFrameAnalysis(Operator, ImportHelper, IOOBJOrientationHelper
                 ib_bin_paths = [os.path.splitext(x)[0] + ".buf" for x in ib_paths]
                 if all(
                     [
-                        os.path.exists(x)
+                        catalog.exists(os.path.basename(x))
                         for x in itertools.chain(vb_bin_paths, ib_bin_paths)
                     ]
                 ):
@@ -1048,7 +1407,7 @@ class Import3DMigotoFrameAnalysis(Operator, ImportHelper, IOOBJOrientationHelper
                     filename[: match.start()] + "*-" + self.pose_cb + "=*.txt"
                 )
                 try:
-                    pose_path = glob(os.path.join(dirname, pose_pattern))[0]
+                    pose_path = catalog.path(catalog.glob(pose_pattern)[0])
                 except IndexError:
                     pass
 
@@ -1227,27 +1586,21 @@ class Import3DMigotoReferenceInputFormat(Operator, ImportHelper):
         if os.path.splitext(self.filepath)[1].lower() == ".fmt":
             return (self.filepath, self.filepath)
 
-        buffer_pattern = re.compile(
-            r"""-(?:ib|vb[0-9]+)(?P<hash>=[0-9a-f]+)?(?=[^0-9a-f=])"""
-        )
-
         dirname = os.path.dirname(self.filepath)
         filename = os.path.basename(self.filepath)
 
-        match = buffer_pattern.search(filename)
+        match = FrameAnalysisCatalog.buffer_pattern.search(filename)
         if match is None:
             raise Fatal(
                 "Reference .txt filename does not look like a 3DMigoto timestamped Frame Analysis Dump"
             )
-        ib_pattern = filename[: match.start()] + "-ib*" + filename[match.end() :]
-        vb_pattern = filename[: match.start()] + "-vb*" + filename[match.end() :]
-        ib_paths = glob(os.path.join(dirname, ib_pattern))
-        vb_paths = glob(os.path.join(dirname, vb_pattern))
-        if len(ib_paths) < 1 or len(vb_paths) < 1:
+        catalog = FrameAnalysisCatalog.from_dir(dirname)
+        ib_names, vb_names = catalog.sibling_buffers(filename)
+        if len(ib_names) < 1 or len(vb_names) < 1:
             raise Fatal(
                 "Unable to locate reference files for both vertex buffer and index buffer format descriptions"
             )
-        return (vb_paths[0], ib_paths[0])
+        return (catalog.path(vb_names[0]), catalog.path(ib_names[0]))
 
     def execute(self, context):
         global migoto_raw_import_options
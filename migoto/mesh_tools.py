@@ -2,6 +2,7 @@ import json
 import bpy
 import bmesh
 import numpy
+from mathutils.kdtree import KDTree
 from bpy.types import Operator, Panel, PropertyGroup
 from bpy.props import IntProperty, CollectionProperty, PointerProperty, EnumProperty
 
@@ -13,8 +14,9 @@ from bpy.props import IntProperty, CollectionProperty, PointerProperty, EnumProp
 # 合并对象上记录原始组件信息的自定义属性名
 MERGED_COMPONENTS_KEY = "MergedSculpt:Components"
 
-# 顶点冻结工具 — 全局缓存
-frozen_vertex_positions = {}
+# 顶点冻结工具 — 物体上记录冻结顶点索引 / 坐标 (float32 扁平数组) 的自定义属性名
+FROZEN_INDICES_KEY = "FrozenVertices:Indices"
+FROZEN_COORDS_KEY = "FrozenVertices:Coords"
 
 
 # =============================================================================
@@ -478,13 +480,18 @@ class XXMI_OT_FreezeSelectedVertices(Operator):
             return {'CANCELLED'}
 
         bpy.ops.object.mode_set(mode='OBJECT')
-        frozen_vertex_positions.clear()
 
-        count = 0
-        for v in obj.data.vertices:
-            if v.select:
-                frozen_vertex_positions[v.index] = v.co.copy()
-                count += 1
+        vertices = obj.data.vertices
+        select = numpy.zeros(len(vertices), dtype=bool)
+        co = numpy.empty(len(vertices) * 3, dtype=numpy.float32)
+        vertices.foreach_get("select", select)
+        vertices.foreach_get("co", co)
+        indices = numpy.flatnonzero(select).astype(numpy.int32)
+        count = len(indices)
+
+        # 以 ID 属性数组保存在物体上，随 .blend 一起存储
+        obj[FROZEN_INDICES_KEY] = indices
+        obj[FROZEN_COORDS_KEY] = co.reshape(-1, 3)[indices].ravel()
 
         bpy.ops.object.mode_set(mode='SCULPT')
         self.report({'INFO'}, f"已冻结 {count} 个顶点位置 (现可进行雕刻)")
@@ -503,21 +510,29 @@ class XXMI_OT_RestoreFrozenVertices(Operator):
             self.report({'WARNING'}, "请在 Sculpt 或 Object 模式中恢复顶点")
             return {'CANCELLED'}
 
-        if not frozen_vertex_positions:
+        if obj.get(FROZEN_INDICES_KEY) is None or obj.get(FROZEN_COORDS_KEY) is None:
             self.report({'WARNING'}, "没有记录冻结的顶点信息")
             return {'CANCELLED'}
 
         if obj.mode == 'SCULPT':
             bpy.ops.object.mode_set(mode='OBJECT')
 
-        for idx, co in frozen_vertex_positions.items():
-            if idx < len(obj.data.vertices):
-                obj.data.vertices[idx].co = co.copy()
+        indices = numpy.array(obj[FROZEN_INDICES_KEY], dtype=numpy.int64)
+        frozen_co = numpy.array(obj[FROZEN_COORDS_KEY], dtype=numpy.float32).reshape(-1, 3)
+        vertices = obj.data.vertices
+        valid = indices < len(vertices)
+
+        # 读出全部坐标，散射写入冻结值后一次性写回
+        co = numpy.empty(len(vertices) * 3, dtype=numpy.float32)
+        vertices.foreach_get("co", co)
+        co = co.reshape(-1, 3)
+        co[indices[valid]] = frozen_co[valid]
+        vertices.foreach_set("co", co.ravel())
 
         obj.data.update()
         bpy.ops.object.mode_set(mode='SCULPT')
 
-        self.report({'INFO'}, f"已恢复 {len(frozen_vertex_positions)} 个顶点的位置")
+        self.report({'INFO'}, f"已恢复 {int(valid.sum())} 个顶点的位置")
         return {'FINISHED'}
 
 
@@ -625,15 +640,26 @@ class XXMI_OT_MergeElements(Operator):
             self.report({'ERROR'}, "请先标记固定元素和移动元素")
             return {'CANCELLED'}
 
+        # KD 树索引固定点，每个移动点只做一次最近邻查询
+        kd = KDTree(len(fixed_elements))
+        for i, fv in enumerate(fixed_elements):
+            kd.insert(fv.co, i)
+        kd.balance()
+
+        # 同时被标记为固定点的移动点保持不动，避免形成焊接链
+        fixed_set = set(fixed_elements)
+        targetmap = {}
         for mv in moving_elements:
-            closest = min(fixed_elements, key=lambda fv: (mv.co - fv.co).length)
-            mv.co = closest.co
+            if mv in fixed_set:
+                continue
+            _, i, _ = kd.find(mv.co)
+            targetmap[mv] = fixed_elements[i]
 
-        unique_verts = list(set(moving_elements + fixed_elements))
-        bmesh.ops.remove_doubles(bm, verts=unique_verts, dist=0.0001)
+        # 按计算出的配对直接焊接，移动点合并到固定点的位置
+        bmesh.ops.weld_verts(bm, targetmap=targetmap)
 
         bmesh.update_edit_mesh(obj.data)
-        self.report({'INFO'}, "缝合完成")
+        self.report({'INFO'}, f"缝合完成: 合并 {len(targetmap)} 个顶点")
         return {'FINISHED'}
 
 
@@ -1,10 +1,14 @@
 import bpy
+import functools
 import math
 import hashlib
+import struct
 import numpy as np
 from bpy.types import Operator, Panel, PropertyGroup
 from bpy.props import EnumProperty, IntProperty, PointerProperty
 
+from .atlas_packing import maxrects_pack, skyline_pack
+
 # =============================================================================
 # 1. 属性定义
 # =============================================================================
@@ -34,6 +38,11 @@ class XXMI_MergeUVProperties(PropertyGroup):
     )
     target_width: IntProperty(name="宽 (W)", default=2048, min=2)
     target_height: IntProperty(name="高 (H)", default=2048, min=2)
+    gutter: IntProperty(
+        name="边缘扩展 (px)",
+        description="将每张贴图的边缘像素向外扩展到空白区域，避免 Mipmap 采样时出现接缝",
+        default=4, min=0, max=64
+    )
 
 # =============================================================================
 # 2. 核心算法与辅助函数
@@ -60,12 +69,68 @@ def apply_size_rule(x, mode):
     else:
         return get_even(x)
 
+# --- 贴图指纹缓存 ---
+# 缓存只在一次操作符执行内有效（见 image_cache_scope），执行前后都会清空：
+# 贴图在两次执行之间被绘制、重新载入或替换时不会用到过期指纹。
+# 像素不做缓存：合成时图集本身已与全部源贴图一样大，再保留源像素会使峰值内存翻倍
+
+_image_hash_cache = {}            # {缓存键: 指纹}
+_pixel_buffer = None              # 计算指纹时复用的读取缓冲区
+_cache_runs = 0                   # 正在执行的 image_cache_scope 层数，为 0 时不读写缓存
+
+def _image_cache_key(img):
+    """贴图状态键：名称、尺寸、路径、脏标记与生成参数任一变化都会失效"""
+    generated = None
+    if img.source == 'GENERATED':
+        generated = (img.generated_type, img.generated_width, img.generated_height,
+                     tuple(img.generated_color))
+    return (img.name, tuple(img.size), img.filepath, img.is_dirty, generated)
+
+def _read_pixels(img, out=None):
+    """用 foreach_get 读取整张贴图；out 长度合适时直接写入 out"""
+    n = img.size[0] * img.size[1] * img.channels
+    if out is None or len(out) != n:
+        out = np.empty(n, dtype=np.float32)
+    img.pixels.foreach_get(out)
+    return out
+
 def get_image_hash(img):
-    if not img or not img.pixels: return None
-    if not img.has_data: img.update()
-    sample_size = min(len(img.pixels), 10000)
-    raw_pixels = np.array(img.pixels[:sample_size])
-    return hashlib.md5(raw_pixels.tobytes() + str(img.size[0]).encode()).hexdigest()
+    """整张贴图的 blake2b 指纹（含尺寸与通道数），按贴图状态缓存"""
+    global _pixel_buffer
+    if not img: return None
+    key = _image_cache_key(img) if _cache_runs else None
+    cached = _image_hash_cache.get(key)
+    if cached is not None:
+        return cached
+    if len(img.pixels) == 0: return None
+
+    _pixel_buffer = _read_pixels(img, _pixel_buffer)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(struct.pack("<3i", img.size[0], img.size[1], img.channels))
+    digest.update(memoryview(_pixel_buffer))
+    result = digest.hexdigest()
+    if _cache_runs:
+        _image_hash_cache[key] = result
+    return result
+
+def clear_image_cache():
+    global _pixel_buffer
+    _image_hash_cache.clear()
+    _pixel_buffer = None
+
+def image_cache_scope(execute):
+    """操作符 execute 的装饰器：本次执行共享指纹缓存，结束后释放"""
+    @functools.wraps(execute)
+    def wrapper(self, context):
+        global _cache_runs
+        clear_image_cache()
+        _cache_runs += 1
+        try:
+            return execute(self, context)
+        finally:
+            _cache_runs -= 1
+            clear_image_cache()
+    return wrapper
 
 def find_node_by_type(material, node_type):
     if not material or not material.use_nodes: return None
@@ -142,16 +207,45 @@ def calculate_packing(images_info, target_w, mode_w, mode_h):
     final_h = apply_size_rule(max_y, mode_h)
     return actual_w, final_h, placements
 
-def find_best_packing(images_info, mode_w, mode_h):
-    """多候选宽度试探，返回利用率（已用像素/总像素）最高的打包方案。
+def pack_images(images_info, target_w, mode_w, mode_h):
+    """在给定宽度下依次尝试货架 / 天际线 / MaxRects 装箱，取高度最小的方案。
+    返回: (w, h, placements, efficiency, method)
+    """
+    total_area = sum(w * h for _, w, h in images_info)
+    max_img_w = max((img[1] for img in images_info), default=0)
+    actual_w = apply_size_rule(max(target_w, max_img_w), mode_w)
+
+    _, shelf_h, shelf_placements = calculate_packing(images_info, actual_w, mode_w, mode_h)
+    results = [(shelf_h, 'SHELF', shelf_placements)]
+    for method, packed in (
+        ('SKYLINE', skyline_pack(images_info, actual_w)),
+        ('MAXRECTS', maxrects_pack(images_info, actual_w, heuristic='BL')),
+    ):
+        if packed is not None:
+            placements, used_h = packed
+            results.append((apply_size_rule(used_h, mode_h), method, placements))
+
+    h, method, placements = min(results, key=lambda r: r[0])
+    atlas_px = actual_w * h
+    efficiency = total_area / atlas_px if atlas_px > 0 else 0.0
+    return actual_w, h, placements, efficiency, method
+
+def _next_legal_size(x, mode):
+    return apply_size_rule(x + 1, mode)
+
+def find_best_packing(images_info, mode_w, mode_h, max_bin_tries=8):
+    """多候选宽度试探，返回利用率（已用像素/总像素）最高、即面积最小的合法图集。
     候选宽度来源：
       1. sqrt(总面积) × 常见长宽比 (0.5~2.0)
       2. 游戏引擎常用尺寸 (512, 1024, 2048, 4096)
       3. 最大贴图宽度落在规则边界上的对齐值
+    每个宽度先用 pack_images 求出可行高度，再用 MaxRects (BSSF) 在更小的
+    合法高度上做定尺寸装箱，尝试进一步缩小图集。
     返回: (best_w, best_h, best_placements, best_efficiency)
     """
     total_area = sum(w * h for _, w, h in images_info)
     max_img_w = max((img[1] for img in images_info), default=0)
+    max_img_h = max((img[2] for img in images_info), default=0)
     base_area = max(total_area, 1)
 
     candidates = set()
@@ -168,15 +262,28 @@ def find_best_packing(images_info, mode_w, mode_h):
         candidates.add(max_img_w + extra)
 
     best = None
-    for w in sorted(candidates):
-        w_aligned = apply_size_rule(w, mode_w)
-        _, h, placements = calculate_packing(images_info, w_aligned, mode_w, mode_h)
-        atlas_px = w_aligned * h
-        efficiency = total_area / atlas_px if atlas_px > 0 else 0.0
-        if best is None or efficiency > best[3]:
-            best = (w_aligned, h, placements, efficiency)
-
-    return best
+    widths = sorted({apply_size_rule(w, mode_w) for w in candidates})
+    for w_aligned in widths:
+        w, h, placements, _, _ = pack_images(images_info, w_aligned, mode_w, mode_h)
+        if best is None or w * h < best[0] * best[1]:
+            best = (w, h, placements)
+
+    # 定尺寸搜索：在面积小于当前最优的合法 (宽, 高) 上尝试 MaxRects
+    for w_aligned in widths:
+        h_try = apply_size_rule(max(max_img_h, math.ceil(total_area / w_aligned)), mode_h)
+        for _ in range(max_bin_tries):
+            if w_aligned * h_try >= best[0] * best[1]:
+                break
+            packed = maxrects_pack(images_info, w_aligned, h_try, heuristic='BSSF')
+            if packed is not None:
+                best = (w_aligned, h_try, packed[0])
+                break
+            h_try = _next_legal_size(h_try, mode_h)
+
+    w, h, placements = best
+    atlas_px = w * h
+    efficiency = total_area / atlas_px if atlas_px > 0 else 0.0
+    return w, h, placements, efficiency
 
 def get_assets_from_objects(objs):
     """返回:
@@ -248,52 +355,141 @@ def _wrap_uv(val):
     """将 UV 坐标 wrap 到 [0, 1) 范围，等效 REPEAT 寻址。"""
     return val % 1.0
 
-def apply_results(objs, flat_pixels, fw, fh, mat_info, unique_imgs, placements):
+def _loop_polygon_indices(mesh):
+    """返回每个 loop 所属的面索引（按 loop_start/loop_total 展开）"""
+    num_polys = len(mesh.polygons)
+    loop_start = np.empty(num_polys, dtype=np.int64)
+    loop_total = np.empty(num_polys, dtype=np.int64)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+    offsets = np.arange(loop_total.sum()) - np.repeat(np.cumsum(loop_total) - loop_total, loop_total)
+    loop_poly = np.empty(len(mesh.loops), dtype=np.int64)
+    loop_poly[np.repeat(loop_start, loop_total) + offsets] = np.repeat(np.arange(num_polys), loop_total)
+    return loop_poly
+
+def remap_object_uvs(obj, fw, fh, mat_info, unique_imgs, placements):
+    """按材质槽查表得到缩放/偏移，对每个目标 UV 层做一次向量化变换"""
+    mesh = obj.data
+    num_slots = len(obj.material_slots)
+    if num_slots == 0 or len(mesh.polygons) == 0:
+        return
+
+    # 每个材质槽: 目标 UV 层名与 (s_u, s_v, o_u, o_v)，不需要变换的槽为 None
+    slot_layer = [None] * num_slots
+    table = np.zeros((num_slots, 4), dtype=np.float64)
+    for i, slot in enumerate(obj.material_slots):
+        mat = slot.material
+        if not mat or mat.name not in mat_info:
+            continue
+        img_hash, uv_layer_name = mat_info[mat.name]
+        if img_hash not in placements:
+            continue
+        # 确定要变换的 UV 层：仅贴图引用的那一层
+        if uv_layer_name and uv_layer_name in mesh.uv_layers:
+            slot_layer[i] = uv_layer_name
+        elif mesh.uv_layers.active:
+            slot_layer[i] = mesh.uv_layers.active.name
+        else:
+            continue
+        px, py = placements[img_hash]
+        img = unique_imgs[img_hash]
+        table[i] = (img.size[0] / fw, img.size[1] / fh, px / fw, py / fh)
+
+    if not any(slot_layer):
+        return
+
+    material_index = np.empty(len(mesh.polygons), dtype=np.int64)
+    mesh.polygons.foreach_get("material_index", material_index)
+    loop_slot = material_index[_loop_polygon_indices(mesh)]
+    # 超出材质槽范围的面不处理
+    in_range = loop_slot < num_slots
+    loop_slot = np.where(in_range, loop_slot, 0)
+
+    for layer_name in dict.fromkeys(name for name in slot_layer if name):
+        slot_mask = np.array([name == layer_name for name in slot_layer])
+        loops = in_range & slot_mask[loop_slot]
+        if not loops.any():
+            continue
+        uv_layer = mesh.uv_layers[layer_name]
+        uv = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        uv_layer.data.foreach_get("uv", uv)
+        uv = uv.reshape(-1, 2)
+        params = table[loop_slot[loops]]
+        # 先 wrap 到 [0,1)，消除 REPEAT 越界
+        wrapped = _wrap_uv(uv[loops].astype(np.float64))
+        uv[loops] = wrapped * params[:, :2] + params[:, 2:]
+        uv_layer.data.foreach_set("uv", uv.ravel())
+
+def _bleed_gutter(atlas, occupied, rect, gutter):
+    """将 rect 的边缘像素复制到其外侧 gutter 像素内的空白区域"""
+    fh, fw = occupied.shape
+    px, py, iw, ih = rect
+    y0, y1 = max(py - gutter, 0), min(py + ih + gutter, fh)
+    x0, x1 = max(px - gutter, 0), min(px + iw + gutter, fw)
+
+    def fill(ys, xs, values):
+        region = atlas[ys, xs]
+        free = ~occupied[ys, xs]
+        if free.any():
+            region[free] = np.broadcast_to(values, region.shape)[free]
+
+    # 上下两侧复制首尾行，左右两侧复制首尾列（含角落，行号夹紧到贴图内）
+    fill(slice(y0, py), slice(px, px + iw), atlas[py, px:px + iw])
+    fill(slice(py + ih, y1), slice(px, px + iw), atlas[py + ih - 1, px:px + iw])
+    rows = np.clip(np.arange(y0, y1), py, py + ih - 1)
+    fill(slice(y0, y1), slice(x0, px), atlas[rows, px][:, None, :])
+    fill(slice(y0, y1), slice(px + iw, x1), atlas[rows, px + iw - 1][:, None, :])
+
+def composite_atlas(fw, fh, placements, unique_imgs, gutter=0):
+    """
+    将各贴图写入 (fh, fw, 4) 的 float32 图集并返回。
+    各贴图依次读入同一块缓冲区（尺寸变化时重新分配），
+    峰值内存约为一张图集加最大的一张源贴图；
+    越界的贴图跳过；gutter > 0 时向空白区域扩展边缘像素。
+    """
+    # 计算指纹时留下的读取缓冲区在分配图集前释放
+    global _pixel_buffer
+    _pixel_buffer = None
+    atlas = np.zeros((fh, fw, 4), dtype=np.float32)
+    occupied = np.zeros((fh, fw), dtype=bool) if gutter > 0 else None
+    buf = None
+    rects = []
+    for h, (px, py) in placements.items():
+        img = unique_imgs.get(h)
+        if not img: continue
+        iw, ih = img.size[0], img.size[1]
+        if not (px >= 0 and py >= 0 and px + iw <= fw and py + ih <= fh):
+            continue
+        buf = _read_pixels(img, buf)
+        atlas[py : py + ih, px : px + iw] = buf.reshape((ih, iw, 4))
+        if occupied is not None:
+            occupied[py : py + ih, px : px + iw] = True
+        rects.append((px, py, iw, ih))
+
+    if occupied is not None:
+        for rect in rects:
+            _bleed_gutter(atlas, occupied, rect, gutter)
+    return atlas
+
+def apply_results(objs, atlas, fw, fh, mat_info, unique_imgs, placements):
     # ---- 只创建一张合并贴图，所有材质共享 ----
     merged_img_name = "MergedAtlas"
     old_img = bpy.data.images.get(merged_img_name)
     if old_img:
         old_img.name = merged_img_name + "_Trash"
-    merged_img = bpy.data.images.new(merged_img_name, width=fw, height=fh, alpha=True)
-    merged_img.pixels.foreach_set(flat_pixels)
+    # 源贴图均为 8 位时合并贴图也使用字节缓冲，存在浮点贴图时才用浮点缓冲
+    use_float = any(img.is_float for img in unique_imgs.values())
+    merged_img = bpy.data.images.new(merged_img_name, width=fw, height=fh, alpha=True,
+                                     float_buffer=use_float)
+    # 连续数组 reshape(-1) 不会复制，直接整体写入
+    merged_img.pixels.foreach_set(atlas.reshape(-1))
     merged_img.update()
     if old_img:
         bpy.data.images.remove(old_img)
 
     # 1. 更新 UV 坐标 —— 只变换贴图实际使用的 UV 层
     for obj in objs:
-        mesh = obj.data
-        for poly in mesh.polygons:
-            if poly.material_index >= len(obj.material_slots):
-                continue
-            mat = obj.material_slots[poly.material_index].material
-            if not mat or mat.name not in mat_info:
-                continue
-            img_hash, uv_layer_name = mat_info[mat.name]
-            if img_hash not in placements:
-                continue
-
-            px, py = placements[img_hash]
-            img = unique_imgs[img_hash]
-            s_u = img.size[0] / fw
-            s_v = img.size[1] / fh
-            o_u = px / fw
-            o_v = py / fh
-
-            # 确定要变换的 UV 层：仅贴图引用的那一层
-            if uv_layer_name and uv_layer_name in mesh.uv_layers:
-                target_layers = [mesh.uv_layers[uv_layer_name]]
-            elif mesh.uv_layers.active:
-                target_layers = [mesh.uv_layers.active]
-            else:
-                continue
-
-            for uv_layer in target_layers:
-                for idx in poly.loop_indices:
-                    uv = uv_layer.data[idx].uv
-                    # 先 wrap 到 [0,1)，消除 REPEAT 越界
-                    uv.x = _wrap_uv(uv.x) * s_u + o_u
-                    uv.y = _wrap_uv(uv.y) * s_v + o_v
+        remap_object_uvs(obj, fw, fh, mat_info, unique_imgs, placements)
 
     # 2. 所有材质指向同一张合并贴图
     for mat_name in mat_info:
@@ -310,6 +506,7 @@ class XXMI_OT_MUV_CalculateSize(Operator):
     bl_label = "预计算最佳尺寸"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @image_cache_scope
     def execute(self, context):
         props = context.scene.xxmi_merge_uv_props
         _, unique_imgs, _ = get_unique_assets(context)
@@ -337,6 +534,7 @@ class XXMI_OT_MUV_RecommendRules(Operator):
     RULES = ('POT', 'MULTI_OF_4', 'EVEN')
     RULE_LABELS = {'POT': "2的幂", 'MULTI_OF_4': "4的倍数", 'EVEN': "2的倍数"}
 
+    @image_cache_scope
     def execute(self, context):
         props = context.scene.xxmi_merge_uv_props
         _, unique_imgs, _ = get_unique_assets(context)
@@ -374,6 +572,7 @@ class XXMI_OT_MUV_ExecuteAutoMerge(Operator):
     bl_label = "执行自动合并"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @image_cache_scope
     def execute(self, context):
         props = context.scene.xxmi_merge_uv_props
         objs, unique_imgs, mat_info = get_unique_assets(context)
@@ -381,18 +580,17 @@ class XXMI_OT_MUV_ExecuteAutoMerge(Operator):
         mode_w, mode_h = props.size_mode_w, props.size_mode_h
         final_w = props.target_width
         images_info = [(h_id, img.size[0], img.size[1]) for h_id, img in unique_imgs.items()]
-        fw, fh, placements = calculate_packing(images_info, final_w, mode_w, mode_h)
-
-        atlas = np.zeros((fh, fw, 4), dtype=np.float32)
-        for h, (px, py) in placements.items():
-            img = unique_imgs[h]
-            iw, ih = img.size[0], img.size[1]
-            src = np.empty(iw * ih * 4, dtype=np.float32)
-            img.pixels.foreach_get(src)
-            if py + ih <= fh and px + iw <= fw:
-                atlas[py : py + ih, px : px + iw] = src.reshape((ih, iw, 4))
-
-        apply_results(objs, atlas.flatten(), fw, fh, mat_info, unique_imgs, placements)
+        fw, fh, placements, efficiency, method = pack_images(images_info, final_w, mode_w, mode_h)
+        # 预计算得到的尺寸可能来自定尺寸搜索，此时直接复用该方案
+        if fw == final_w and props.target_height < fh:
+            packed = maxrects_pack(images_info, fw, props.target_height, heuristic='BSSF')
+            if packed is not None and apply_size_rule(props.target_height, mode_h) == props.target_height:
+                fh, placements, method = props.target_height, packed[0], 'MAXRECTS'
+                efficiency = sum(w * h for _, w, h in images_info) / (fw * fh)
+
+        atlas = composite_atlas(fw, fh, placements, unique_imgs, props.gutter)
+        apply_results(objs, atlas, fw, fh, mat_info, unique_imgs, placements)
+        self.report({'INFO'}, f"合并完成: {fw}×{fh} ({method})  |  利用率: {round(efficiency * 100, 1)}%")
         return {'FINISHED'}
 
 class XXMI_OT_MUV_StartLayout(Operator):
@@ -400,6 +598,7 @@ class XXMI_OT_MUV_StartLayout(Operator):
     bl_label = "1. ��成面片网格"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @image_cache_scope
     def execute(self, context):
         objs, unique_imgs, _ = get_unique_assets(context)
         if not unique_imgs:
@@ -452,6 +651,7 @@ class XXMI_OT_MUV_ConfirmLayout(Operator):
     bl_label = "2. 确认合并"
     bl_options = {'REGISTER', 'UNDO'}
 
+    @image_cache_scope
     def execute(self, context):
         props = context.scene.xxmi_merge_uv_props
         col = bpy.data.collections.get("Texture_Layout_Canvas")
@@ -482,7 +682,6 @@ class XXMI_OT_MUV_ConfirmLayout(Operator):
         final_w = apply_size_rule(total_w_px, mode_w)
         final_h = apply_size_rule(total_h_px, mode_h)
 
-        atlas = np.zeros((final_h, final_w, 4), dtype=np.float32)
         placements = {}
         objs, unique_imgs, mat_info = get_assets_from_objects(target_objs)
 
@@ -495,13 +694,9 @@ class XXMI_OT_MUV_ConfirmLayout(Operator):
             px = int(round((p_left - min_x) * 1000))
             py = int(round((p_bottom - min_y) * 1000))
             placements[h_id] = (px, py)
-            iw, ih = img.size[0], img.size[1]
-            src = np.empty(iw * ih * 4, dtype=np.float32)
-            img.pixels.foreach_get(src)
-            if py + ih <= final_h and px + iw <= final_w and py >= 0 and px >= 0:
-                atlas[py : py + ih, px : px + iw] = src.reshape((ih, iw, 4))
 
-        apply_results(objs, atlas.flatten(), final_w, final_h, mat_info, unique_imgs, placements)
+        atlas = composite_atlas(final_w, final_h, placements, unique_imgs, props.gutter)
+        apply_results(objs, atlas, final_w, final_h, mat_info, unique_imgs, placements)
         bpy.data.collections.remove(col, do_unlink=True)
         restore_viewport(context)
         bpy.ops.object.select_all(action='DESELECT')
@@ -534,6 +729,7 @@ class XXMI_PT_MergeUVPanel(Panel):
         rule_row.prop(props, "size_mode_w", text="宽")
         rule_row.prop(props, "size_mode_h", text="高")
         rule_row.operator("xxmi.muv_recommend_rules", text="", icon='LIGHT')
+        layout.prop(props, "gutter")
         layout.separator()
         layout.prop(props, "workflow_tab", expand=True)
         if props.workflow_tab == 'AUTO':
@@ -575,6 +771,7 @@ def register():
         bpy.types.Scene.xxmi_merge_uv_props = PointerProperty(type=XXMI_MergeUVProperties)
 
 def unregister():
+    clear_image_cache()
     if hasattr(bpy.types.Scene, "xxmi_merge_uv_props"):
         del bpy.types.Scene.xxmi_merge_uv_props
     for cls in reversed(classes):
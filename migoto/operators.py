@@ -1,4 +1,5 @@
 import bpy
+import numpy
 from bpy.props import BoolProperty, IntProperty, StringProperty
 from bpy.types import Operator, AddonPreferences
 from bpy_extras.io_utils import ImportHelper, orientation_helper
@@ -14,6 +15,11 @@ from .datahandling import (
 )
 
 from .datastructures import IOOBJOrientationHelper
+from .vertex_weights import (
+    add_weights_bucketed,
+    extract_vertex_weights,
+    remove_unused_vertex_groups,
+)
 
 
 class ApplyVGMap(Operator, ImportHelper):
@@ -243,6 +249,39 @@ class Preferences(AddonPreferences):
         # ops.url=addon_updater_ops.updater.website
 
 
+def merge_shared_name_vgs(ob, columns, vname):
+    """Sum every vertex group whose base name is vname into a single group.
+
+    columns maps vertex group names to their (vertex_ids, weights) arrays and is
+    kept in sync with the groups added, removed and renamed here, so merging
+    several base names only reads the weights from the mesh once.
+    """
+    relevant = [x.name for x in ob.vertex_groups if x.name.split(".")[0] == vname]
+    if not relevant:
+        return
+
+    combined = numpy.zeros(len(ob.data.vertices), dtype=numpy.float32)
+    for name in relevant:
+        vertex_ids, weights = columns[name]
+        numpy.add.at(combined, vertex_ids, weights)
+    # Adding with "ADD" clamps to 1.0, keep the merged weights in range too
+    numpy.clip(combined, 0.0, 1.0, out=combined)
+
+    vgroup = ob.vertex_groups.new(name=f"x{vname}")
+    vertex_ids = numpy.flatnonzero(combined > 0)
+    add_weights_bucketed(vgroup, vertex_ids, combined[vertex_ids], "REPLACE")
+    columns[vgroup.name] = (vertex_ids, combined[vertex_ids])
+
+    for name in relevant:
+        ob.vertex_groups.remove(ob.vertex_groups[name])
+        del columns[name]
+    for vg in ob.vertex_groups:
+        if vg.name[0].lower() == "x":
+            members = columns.pop(vg.name)
+            vg.name = vg.name[1:]
+            columns[vg.name] = members
+
+
 class VGROUP_SN_merge(bpy.types.Operator):
     bl_description = "Merge the vertex groups with shared name"
     bl_idname = "mesh.merge_shared_name_vgs"
@@ -272,35 +311,15 @@ class VGROUP_SN_merge(bpy.types.Operator):
                 continue
 
             # myyy
+            columns = {
+                vg.name: members
+                for vg, members in zip(
+                    ob.vertex_groups, extract_vertex_weights(ob).split_by_group()
+                )
+            }
             vgroup_names = [x.name.split(".")[0] for x in ob.vertex_groups]
-            for vname in vgroup_names:
-                relevant = [
-                    x.name
-                    for x in ob.vertex_groups
-                    if x.name.split(".")[0] == f"{vname}"
-                ]
-                if relevant:
-                    vgroup = ob.vertex_groups.new(name=f"x{vname}")
-                    for vert_id, vert in enumerate(ob.data.vertices):
-                        available_groups = [
-                            v_group_elem.group for v_group_elem in vert.groups
-                        ]
-
-                        combined = 0
-                        for v in relevant:
-                            if ob.vertex_groups[v].index in available_groups:
-                                combined += ob.vertex_groups[v].weight(vert_id)
-                                if combined > 0:
-                                    vgroup.add([vert_id], combined, "ADD")
-                    for vg in [
-                        x
-                        for x in ob.vertex_groups
-                        if x.name.split(".")[0] == f"{vname}"
-                    ]:
-                        ob.vertex_groups.remove(vg)
-                    for vg in ob.vertex_groups:
-                        if vg.name[0].lower() == "x":
-                            vg.name = vg.name[1:]
+            for vname in dict.fromkeys(vgroup_names):
+                merge_shared_name_vgs(ob, columns, vname)
 
             bpy.ops.object.vertex_group_sort()
 
@@ -338,30 +357,13 @@ class VGROUP_SN_merge_ONE(bpy.types.Operator):
             vname = ob.vertex_groups.active.name
             if "." in vname:
                 vname = vname.split(".")[0]
-            vgroup_names = [x.name.split(".")[0] for x in ob.vertex_groups]
-            relevant = [
-                x.name for x in ob.vertex_groups if x.name.split(".")[0] == f"{vname}"
-            ]
-
-            if relevant:
-                vgroup = ob.vertex_groups.new(name=f"x{vname}")
-                for vert_id, vert in enumerate(ob.data.vertices):
-                    available_groups = [
-                        v_group_elem.group for v_group_elem in vert.groups
-                    ]
-                    combined = 0
-                    for v in relevant:
-                        if ob.vertex_groups[v].index in available_groups:
-                            combined += ob.vertex_groups[v].weight(vert_id)
-                            if combined > 0:
-                                vgroup.add([vert_id], combined, "ADD")
-                for vg in [
-                    x for x in ob.vertex_groups if x.name.split(".")[0] == f"{vname}"
-                ]:
-                    ob.vertex_groups.remove(vg)
-                for vg in ob.vertex_groups:
-                    if vg.name[0].lower() == "x":
-                        vg.name = vg.name[1:]
+            columns = {
+                vg.name: members
+                for vg, members in zip(
+                    ob.vertex_groups, extract_vertex_weights(ob).split_by_group()
+                )
+            }
+            merge_shared_name_vgs(ob, columns, vname)
 
             bpy.ops.object.vertex_group_sort()
 
@@ -447,17 +449,8 @@ class VGROUP_SN_remove(bpy.types.Operator):
                 continue
 
             # myyy
-            used_groups = set()
-
-            # Used groups from weight paint
-            for id, vert in enumerate(ob.data.vertices):
-                for vg in vert.groups:
-                    vgi = vg.group
-                    used_groups.add(vgi)
-            # removing
-            for vg in list(reversed(ob.vertex_groups)):
-                if vg.index not in used_groups:
-                    ob.vertex_groups.remove(vg)
+            # Used groups from weight paint, including zero-weight assignments
+            remove_unused_vertex_groups(ob, require_weight=False)
 
         # bpy.ops.object.vertex_group_sort()
 
@@ -542,21 +535,20 @@ class RESET_VERTEX_COLORS(bpy.types.Operator):
         layout.prop(self, "domain", text="Domain")
 
     def execute(self, context):
+        color = numpy.asarray(self.color, dtype=numpy.float32)
         for obj in context.selected_objects:
             if obj.type != "MESH":
                 continue
 
-            bpy.ops.object.select_all(action="DESELECT")
-            obj.select_set(True)
-            context.view_layer.objects.active = obj
-            if "COLOR" in obj.data.color_attributes:
-                obj.data.color_attributes.remove(obj.data.color_attributes["COLOR"])
-            bpy.ops.geometry.color_attribute_add(
-                name="COLOR",
-                domain="CORNER",
-                data_type="BYTE_COLOR",
-                color=self.color,
+            mesh = obj.data
+            if "COLOR" in mesh.color_attributes:
+                mesh.color_attributes.remove(mesh.color_attributes["COLOR"])
+            color_attr = mesh.color_attributes.new(
+                name="COLOR", type=self.data_type, domain=self.domain
             )
+            # Fill every element in a single call instead of per-element writes
+            color_attr.data.foreach_set("color", numpy.tile(color, len(color_attr.data)))
+            mesh.update()
 
         return {"FINISHED"}
 
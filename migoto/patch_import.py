@@ -1,8 +1,11 @@
 import bpy
 import os
+import bisect
 import functools
 import sys
 
+from . import vertex_weights
+
 # =============================================================================
 # 0. 辅助功能：模型清理逻辑 & 材质贴图逻辑
 # =============================================================================
@@ -12,16 +15,7 @@ def remove_unused_vertex_groups(obj):
     '''
     if obj.type == "MESH":
         obj.update_from_editmode()
-        vgroup_used = {i: False for i, k in enumerate(obj.vertex_groups)}
-
-        for v in obj.data.vertices:
-            for g in v.groups:
-                if g.weight > 0.0:
-                    vgroup_used[g.group] = True
-
-        for i, used in sorted(vgroup_used.items(), reverse=True):
-            if not used:
-                obj.vertex_groups.remove(obj.vertex_groups[i])
+        vertex_weights.remove_unused_vertex_groups(obj)
 
 def perform_cleanup_job(context):
     """
@@ -41,13 +35,8 @@ def perform_cleanup_job(context):
         try:
             context.view_layer.objects.active = obj
             
-            # --- A. 清理孤立几何体 ---
-            bpy.ops.object.mode_set(mode='EDIT')
-            bpy.ops.mesh.select_all(action='SELECT')
-            bpy.ops.mesh.delete_loose()
-            bpy.ops.object.mode_set(mode='OBJECT')
-            
-            # --- B. 移除未使用顶点组 ---
+            # 孤立几何体已在导入时由 clean_loose 清理 (见 execute_hook)
+            # --- 移除未使用顶点组 ---
             remove_unused_vertex_groups(obj)
             
         except Exception as e:
@@ -56,6 +45,81 @@ def perform_cleanup_job(context):
     print("[XXMI] 清理完成")
 
 
+# 参照原项目的贴图类型后缀优先级
+TEXTURE_TYPES = ["Diffuse", "LightMap", "NormalMap", "StockingMap", "MaterialMap", "Skill", "DiffuseUlt", "idle", "Back"]
+TEXTURE_EXTS = ('.dds', '.png', '.jpg', '.jpeg', '.tga', '.bmp')
+
+
+def build_texture_index(files):
+    """
+    一次遍历目录文件名，按贴图类型后缀建立索引:
+    {tex_type: (升序的基础网格名列表, {基础网格名: 文件名})}
+    同一基础名有多个扩展名时按 TEXTURE_EXTS 的顺序优先。
+    """
+    index = {tex_type: {} for tex_type in TEXTURE_TYPES}
+    ext_rank = {ext: i for i, ext in enumerate(TEXTURE_EXTS)}
+    for f in files:
+        fname, ext = os.path.splitext(f)
+        rank = ext_rank.get(ext.lower())
+        if rank is None:
+            continue
+        for tex_type in TEXTURE_TYPES:
+            if fname.endswith(tex_type):
+                base = fname[:-len(tex_type)]
+                current = index[tex_type].get(base)
+                if current is None or rank < current[0]:
+                    index[tex_type][base] = (rank, f)
+    return {
+        tex_type: (sorted(bases), {base: f for base, (_, f) in bases.items()})
+        for tex_type, bases in index.items()
+    }
+
+
+def find_texture_file(index, mesh_name):
+    """
+    按贴图类型优先级查找物体名以基础网格名开头的贴图文件。
+    在有序基础名列表上二分查找物体名的各个前缀，最长前缀优先。
+    """
+    for tex_type in TEXTURE_TYPES:
+        bases, files = index[tex_type]
+        if not bases:
+            continue
+        for length in range(len(mesh_name), -1, -1):
+            prefix = mesh_name[:length]
+            pos = bisect.bisect_left(bases, prefix)
+            if pos < len(bases) and bases[pos] == prefix:
+                return files[prefix]
+    return None
+
+
+def load_texture_image(context, img_path):
+    """加载贴图：优先复用已加载图片，其次原生 TextureHandler，最后常规加载"""
+    target_img_name = os.path.basename(img_path)
+    fname_no_ext = os.path.splitext(target_img_name)[0]
+
+    # 尝试获取已加载的图片 (原项目可能会把名字去掉扩展名)
+    img = bpy.data.images.get(target_img_name) or bpy.data.images.get(fname_no_ext)
+
+    # 如果没加载，则尝试加载
+    if not img:
+        try:
+            from .texturehandling import TextureHandler
+            TextureHandler.convert_dds(context, file=img_path)
+            img = bpy.data.images.get(target_img_name) or bpy.data.images.get(fname_no_ext)
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"[XXMI] 原生 TextureHandler 失败，尝试常规加载: {e}")
+
+    if not img:
+        try:
+            img = bpy.data.images.load(img_path)
+        except Exception as e:
+            print(f"[XXMI Warning] 无法加载图片 {img_path}: {e}")
+            img = None
+    return img
+
+
 def perform_material_texture_job(context, filepath):
     """
     执行材质与贴图处理逻辑:
@@ -71,10 +135,10 @@ def perform_material_texture_job(context, filepath):
     if not dump_dir or not os.path.exists(dump_dir):
         return
 
-    files = os.listdir(dump_dir)
-    # 参照原项目的贴图类型后缀优先级
-    texture_types = ["Diffuse", "LightMap", "NormalMap", "StockingMap", "MaterialMap", "Skill", "DiffuseUlt", "idle", "Back"]
-    valid_exts = ('.dds', '.png', '.jpg', '.jpeg', '.tga', '.bmp')
+    # 整个导入只扫描一次目录
+    texture_index = build_texture_index(os.listdir(dump_dir))
+    # {图片路径: Image 或 None}，同一贴图只加载/转换一次，失败也不再重试
+    loaded_images = {}
 
     print(f"[XXMI] 开始为 {len(target_objs)} 个物体处理材质与纹理...")
 
@@ -93,49 +157,15 @@ def perform_material_texture_job(context, filepath):
         
         # 2. 文件名去后缀后，检查物体名是否以其开头
         # 例如文件是 BodyDiffuse.dds，前缀是 Body，而物体名可能是 Body.001
-        target_img_name = None
-        for tex_type in texture_types:
-            for f in files:
-                fname, ext = os.path.splitext(f)
-                if ext.lower() not in valid_exts:
-                    continue
-                
-                # 如果文件名以贴图类型结尾 (如 Diffuse)
-                if fname.endswith(tex_type):
-                    base_mesh_name = fname[:-len(tex_type)]
-                    # 匹配规则：物体名以基础网格名开头即可
-                    if mesh_name.startswith(base_mesh_name):
-                        target_img_name = f
-                        break
-            if target_img_name:
-                break
-        
+        target_img_name = find_texture_file(texture_index, mesh_name)
+
         # 3. 加载图片并连接节点
         if target_img_name:
             img_path = os.path.join(dump_dir, target_img_name)
-            fname_no_ext = os.path.splitext(target_img_name)[0]
-            
-            # 尝试获取已加载的图片 (原项目可能会把名字去掉扩展名)
-            img = bpy.data.images.get(target_img_name) or bpy.data.images.get(fname_no_ext)
-            
-            # 如果没加载，则尝试加载
-            if not img:
-                try:
-                    from .texturehandling import TextureHandler
-                    TextureHandler.convert_dds(context, file=img_path)
-                    img = bpy.data.images.get(target_img_name) or bpy.data.images.get(fname_no_ext)
-                except ImportError:
-                    pass
-                except Exception as e:
-                    print(f"[XXMI] 原生 TextureHandler 失败，尝试常规加载: {e}")
-                    
-            if not img:
-                try:
-                    img = bpy.data.images.load(img_path)
-                except Exception as e:
-                    print(f"[XXMI Warning] 无法加载图片 {img_path}: {e}")
-                    img = None
-                    
+            if img_path not in loaded_images:
+                loaded_images[img_path] = load_texture_image(context, img_path)
+            img = loaded_images[img_path]
+
             if img:
                 nodes = mat.node_tree.nodes
                 links = mat.node_tree.links
@@ -201,6 +231,10 @@ def execute_hook(self, context):
         self.flip_mesh = True
         print("[XXMI] 已应用 Flip Mesh (X轴镜像+翻转面)")
 
+    # 孤立几何体交给导入器在建网格前用 NumPy 清理，不再事后进入编辑模式
+    if getattr(context.scene, "xxmi_cleanup_enabled", False):
+        self.clean_loose = True
+
     # --- 阶段 1: 执行原版导入 ---
     if OriginalExecute:
         try:
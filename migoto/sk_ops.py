@@ -1,5 +1,6 @@
 import bpy
 import time
+import numpy as np
 from bpy.types import Operator, PropertyGroup, Panel
 from bpy.props import BoolProperty, CollectionProperty
 
@@ -12,66 +13,116 @@ def log(msg):
     current_time = time.strftime("%H:%M", t)
     print(f"<XXMI SK> {current_time} {msg}")
 
-def copy_object(obj, times=1, offset=0):
-    objects = []
-    for i in range(0, times):
-        copy_obj = obj.copy()
-        copy_obj.data = obj.data.copy()
-        copy_obj.name = obj.name + "_shapekey_" + str(i+1)
-        copy_obj.location.x += offset*(i+1)
-        bpy.context.collection.objects.link(copy_obj)
-        objects.append(copy_obj)
-    return objects
-
-def apply_shapekey(obj, sk_keep):
-    shapekeys = obj.data.shape_keys.key_blocks
-    if sk_keep < 0 or sk_keep > len(shapekeys):
-        return
-    for i in reversed(range(0, len(shapekeys))):
-        if i != sk_keep:
-            obj.shape_key_remove(shapekeys[i])
-    obj.shape_key_remove(shapekeys[0])
-
-def apply_modifiers(obj):
-    modifiers = obj.modifiers
-    for modifier in modifiers:
-        if modifier.type == 'SUBSURF':
-            modifier.show_only_control_edges = False
-    for o in bpy.context.scene.objects:
-        o.select_set(False)
-    obj.select_set(True)
-    bpy.context.view_layer.objects.active = obj
-    bpy.ops.object.convert(target='MESH')
-
-def remove_modifiers(obj):
-    for i in reversed(range(0, len(obj.modifiers))):
-        obj.modifiers.remove(obj.modifiers[i])
-
-def apply_subdmod(obj):
-    modifiers = [mod for mod in obj.modifiers if mod.type == 'SUBSURF']
-    if not modifiers: return
-    for o in bpy.context.scene.objects:
-        o.select_set(False)
-    bpy.context.view_layer.objects.active = obj
-    modifiers[0].show_only_control_edges = False
-    bpy.ops.object.modifier_apply(modifier=modifiers[0].name)
-
-def apply_modifier(obj, modifier_name):
-    modifier = [mod for mod in obj.modifiers if mod.name == modifier_name]
-    if not modifier: return
-    modifier = modifier[0]
-    for o in bpy.context.scene.objects:
-        o.select_set(False)
-    bpy.context.view_layer.objects.active = obj
-    bpy.ops.object.modifier_apply(modifier=modifier.name)
-
-def add_objs_shapekeys(destination, sources):
-    for o in bpy.context.scene.objects:
-        o.select_set(False)
-    for src in sources:
-        src.select_set(True)
-    bpy.context.view_layer.objects.active = destination
-    bpy.ops.object.join_shapes()
+def apply_modifiers_keep_shapekeys(context, obj, should_apply):
+    """
+    在单个物体上应用 should_apply(mod) 为真的修改器并保留全部形态键。
+    逐个形态键 (show_only_shape_key) 求值 depsgraph，结果写入预分配的
+    (K, V, 3) 数组，再一次性 foreach_set 到新网格的形态键中。
+    视图中隐藏的修改器不会被启用或应用，与转换为网格时一样只计算可见的修改器。
+    求值期间临时取消静音并清除顶点组，使结果与原始形态键数据一致；
+    重建时恢复 mute、vertex_group、relative_key、滑块范围与数值。
+    未应用的修改器保留在物体上。各形态键求值后顶点数不一致时抛出 ValueError。
+    """
+    if obj.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+    key_blocks = obj.data.shape_keys.key_blocks
+    sk_names = [block.name for block in key_blocks]
+    sk_settings = [{
+        "value": block.value,
+        "mute": block.mute,
+        "vertex_group": block.vertex_group,
+        "relative_key": block.relative_key.name,
+        "slider_min": block.slider_min,
+        "slider_max": block.slider_max,
+    } for block in key_blocks]
+    num_shapes = len(key_blocks)
+
+    applied = [mod for mod in obj.modifiers if mod.show_viewport and should_apply(mod)]
+    applied_names = {mod.name for mod in applied}
+    show_viewport = {mod.name: mod.show_viewport for mod in obj.modifiers}
+    prev_show_only = obj.show_only_shape_key
+    prev_active = obj.active_shape_key_index
+
+    for mod in obj.modifiers:
+        if mod.type == 'SUBSURF':
+            mod.show_only_control_edges = False
+        # 求值时只保留要应用的修改器，原本隐藏的修改器不会被启用
+        mod.show_viewport = show_viewport[mod.name] and mod.name in applied_names
+
+    new_mesh = None
+    try:
+        # show_only_shape_key 会用基态代替静音的形态键，并按顶点组加权，
+        # 求值时临时关闭这两项，得到原始的形态键坐标
+        for block in key_blocks:
+            block.mute = False
+            block.vertex_group = ""
+        obj.show_only_shape_key = True
+        coords = None
+        for i in range(num_shapes):
+            obj.active_shape_key_index = i
+            depsgraph = context.evaluated_depsgraph_get()
+            depsgraph.update()
+            obj_eval = obj.evaluated_get(depsgraph)
+            if i == 0:
+                new_mesh = bpy.data.meshes.new_from_object(
+                    obj_eval, preserve_all_data_layers=True, depsgraph=depsgraph)
+                num_verts = len(new_mesh.vertices)
+                coords = np.empty((num_shapes, num_verts, 3), dtype=np.float32)
+                new_mesh.vertices.foreach_get("co", coords[0].ravel())
+                continue
+            eval_mesh = obj_eval.to_mesh()
+            try:
+                if len(eval_mesh.vertices) != num_verts:
+                    raise ValueError(
+                        f"形态键 '{sk_names[i]}' 求值后顶点数 ({len(eval_mesh.vertices)}) "
+                        f"与基态 ({num_verts}) 不一致，无法保留形态键")
+                eval_mesh.vertices.foreach_get("co", coords[i].ravel())
+            finally:
+                obj_eval.to_mesh_clear()
+    except Exception:
+        if new_mesh is not None:
+            bpy.data.meshes.remove(new_mesh)
+        raise
+    finally:
+        obj.show_only_shape_key = prev_show_only
+        obj.active_shape_key_index = prev_active
+        for block, settings in zip(key_blocks, sk_settings):
+            block.mute = settings["mute"]
+            block.vertex_group = settings["vertex_group"]
+        for mod in obj.modifiers:
+            mod.show_viewport = show_viewport[mod.name]
+
+    # 替换网格并重建形态键
+    old_mesh = obj.data
+    mesh_name = old_mesh.name
+    obj.data = new_mesh
+    for mod in applied:
+        obj.modifiers.remove(mod)
+    if old_mesh.users == 0:
+        bpy.data.meshes.remove(old_mesh)
+    new_mesh.name = mesh_name
+
+    for i, name in enumerate(sk_names):
+        block = obj.shape_key_add(name=name, from_mix=False)
+        block.data.foreach_set("co", coords[i].ravel())
+    new_blocks = new_mesh.shape_keys.key_blocks
+    for block, settings in zip(new_blocks, sk_settings):
+        # 滑块上下限互相钳制，按不会被钳制的顺序写入
+        if settings["slider_max"] >= block.slider_min:
+            block.slider_max = settings["slider_max"]
+            block.slider_min = settings["slider_min"]
+        else:
+            block.slider_min = settings["slider_min"]
+            block.slider_max = settings["slider_max"]
+        block.value = settings["value"]
+        block.mute = settings["mute"]
+        block.vertex_group = settings["vertex_group"]
+        if settings["relative_key"] in new_blocks:
+            block.relative_key = new_blocks[settings["relative_key"]]
+    obj.active_shape_key_index = min(prev_active, num_shapes - 1)
+    new_mesh.update()
+    log(f"{obj.name}: 已应用 {len(applied)} 个修改器，重建 {num_shapes} 个形态键")
 
 # =============================================================================
 # 2. 数据属性与操作符
@@ -109,39 +160,14 @@ class XXMI_OT_ApplyModsKeepSK(Operator):
         if self.validate_input(self.obj) == {'CANCELLED'}:
             return {'CANCELLED'}
         
-        sk_names = [block.name for block in self.obj.data.shape_keys.key_blocks]
-        sk_values = [block.value for block in self.obj.data.shape_keys.key_blocks]
-
-        receiver = copy_object(self.obj, times=1, offset=0)[0]
-        receiver.name = "sk_receiver"
-        apply_shapekey(receiver, 0)
-        apply_modifiers(receiver)
-
-        num_shapes = len(self.obj.data.shape_keys.key_blocks)
-        for i in range(1, num_shapes):
-            blendshape = copy_object(self.obj, times=1, offset=0)[0]
-            apply_shapekey(blendshape, i)
-            apply_modifiers(blendshape)
-            add_objs_shapekeys(receiver, [blendshape])
-            if i < len(receiver.data.shape_keys.key_blocks):
-                receiver.data.shape_keys.key_blocks[i].name = sk_names[i]
-            
-            mesh_data = blendshape.data
-            bpy.data.objects.remove(blendshape)
-            bpy.data.meshes.remove(mesh_data)
-        
-        for i, val in enumerate(sk_values):
-            if i < len(receiver.data.shape_keys.key_blocks):
-                receiver.data.shape_keys.key_blocks[i].value = val
-
-        orig_name = self.obj.name
-        orig_data = self.obj.data
-        bpy.data.objects.remove(self.obj)
-        bpy.data.meshes.remove(orig_data)
-        receiver.name = orig_name
-        
-        context.view_layer.objects.active = receiver
-        receiver.select_set(True)
+        try:
+            apply_modifiers_keep_shapekeys(context, self.obj, lambda mod: mod.show_viewport)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        context.view_layer.objects.active = self.obj
+        self.obj.select_set(True)
 
         return {'FINISHED'}
 
@@ -164,39 +190,16 @@ class XXMI_OT_ApplySubdKeepSK(Operator):
         if self.validate_input(self.obj) == {'CANCELLED'}:
             return {'CANCELLED'}
         
-        sk_names = [block.name for block in self.obj.data.shape_keys.key_blocks]
-        sk_values = [block.value for block in self.obj.data.shape_keys.key_blocks]
-
-        receiver = copy_object(self.obj, times=1, offset=0)[0]
-        receiver.name = "sk_receiver"
-        apply_shapekey(receiver, 0)
-        apply_subdmod(receiver)
-
-        num_shapes = len(self.obj.data.shape_keys.key_blocks)
-        for i in range(1, num_shapes):
-            blendshape = copy_object(self.obj, times=1, offset=0)[0]
-            apply_shapekey(blendshape, i)
-            apply_subdmod(blendshape)
-            add_objs_shapekeys(receiver, [blendshape])
-            if i < len(receiver.data.shape_keys.key_blocks):
-                receiver.data.shape_keys.key_blocks[i].name = sk_names[i]
-            
-            mesh_data = blendshape.data
-            bpy.data.objects.remove(blendshape)
-            bpy.data.meshes.remove(mesh_data)
-        
-        for i, val in enumerate(sk_values):
-            if i < len(receiver.data.shape_keys.key_blocks):
-                receiver.data.shape_keys.key_blocks[i].value = val
-
-        orig_name = self.obj.name
-        orig_data = self.obj.data
-        bpy.data.objects.remove(self.obj)
-        bpy.data.meshes.remove(orig_data)
-        receiver.name = orig_name
-        
-        context.view_layer.objects.active = receiver
-        receiver.select_set(True)
+        # 与原行为一致：只应用第一个表面细分修改器
+        subd = next(mod for mod in self.obj.modifiers if mod.type == 'SUBSURF')
+        try:
+            apply_modifiers_keep_shapekeys(context, self.obj, lambda mod: mod == subd)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        context.view_layer.objects.active = self.obj
+        self.obj.select_set(True)
         return {'FINISHED'}
 
 class XXMI_OT_ApplyModsChoiceKeepSK(Operator):
@@ -221,48 +224,18 @@ class XXMI_OT_ApplyModsChoiceKeepSK(Operator):
         return context.window_manager.invoke_props_dialog(self, width=300)
 
     def execute(self, context):
-        sk_names = [block.name for block in self.obj.data.shape_keys.key_blocks]
-        sk_values = [block.value for block in self.obj.data.shape_keys.key_blocks]
-
         selected_mods = [entry.name for entry in self.resource_list if entry.selected]
         if not selected_mods:
             return {'CANCELLED'}
 
-        receiver = copy_object(self.obj, times=1, offset=0)[0]
-        receiver.name = "sk_receiver"
-        apply_shapekey(receiver, 0)
-        for mod_name in selected_mods:
-            apply_modifier(receiver, mod_name)
-        
-        num_shapes = len(self.obj.data.shape_keys.key_blocks)
-        for i in range(1, num_shapes):
-            blendshape = copy_object(self.obj, times=1, offset=0)[0]
-            apply_shapekey(blendshape, i)
-            for mod_name in selected_mods:
-                apply_modifier(blendshape, mod_name)
-            
-            remove_modifiers(blendshape)
-            
-            add_objs_shapekeys(receiver, [blendshape])
-            if i < len(receiver.data.shape_keys.key_blocks):
-                receiver.data.shape_keys.key_blocks[i].name = sk_names[i]
-            
-            mesh_data = blendshape.data
-            bpy.data.objects.remove(blendshape)
-            bpy.data.meshes.remove(mesh_data)
-        
-        for i, val in enumerate(sk_values):
-            if i < len(receiver.data.shape_keys.key_blocks):
-                receiver.data.shape_keys.key_blocks[i].value = val
-
-        orig_name = self.obj.name
-        orig_data = self.obj.data
-        bpy.data.objects.remove(self.obj)
-        bpy.data.meshes.remove(orig_data)
-        receiver.name = orig_name
-        
-        context.view_layer.objects.active = receiver
-        receiver.select_set(True)
+        try:
+            apply_modifiers_keep_shapekeys(context, self.obj, lambda mod: mod.name in selected_mods)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        context.view_layer.objects.active = self.obj
+        self.obj.select_set(True)
         return {'FINISHED'}
 
     def draw(self, context):
@@ -184,6 +184,9 @@ class MIGOTO_PT_ImportFrameAnalysisCleanUp(MigotoImportOptionsPanelBase, Panel):
         MigotoImportOptionsPanelBase.draw(self, context)
         operator = context.space_data.active_operator
         self.layout.prop(operator, "merge_verts")
+        row = self.layout.row()
+        row.enabled = operator.merge_verts
+        row.prop(operator, "merge_verts_keep_seams")
         self.layout.prop(operator, "tris_to_quads")
         self.layout.prop(operator, "clean_loose")
 
@@ -1,4 +1,5 @@
 import bpy
+import numpy as np
 
 # =============================================================================
 # 1. 属性定义
@@ -14,6 +15,15 @@ class XXMI_VertexColorProperties(bpy.types.PropertyGroup):
 # =============================================================================
 # 2. 辅助函数
 # =============================================================================
+def _fill_color_attribute(mesh, name, color, domain='CORNER', data_type='BYTE_COLOR'):
+    """重建名为 name 的颜色属性，并用一次 foreach_set 填充为同一颜色"""
+    if name in mesh.attributes:
+        mesh.attributes.remove(mesh.attributes[name])
+    color_attr = mesh.attributes.new(name=name, domain=domain, type=data_type)
+    colors = np.tile(np.asarray(color, dtype=np.float32), len(color_attr.data))
+    color_attr.data.foreach_set("color", colors)
+    return color_attr
+
 def _apply_vertex_color_to_selected(context, operator_instance):
     if not hasattr(context.scene, "xxmi_vertex_color_props"):
         operator_instance.report({'ERROR'}, "插件属性未加载，请重启 Blender")
@@ -30,23 +40,12 @@ def _apply_vertex_color_to_selected(context, operator_instance):
     applied_count = 0
     for obj in selected_objects:
         if obj.type == 'MESH':
-            # 移除现有的COLOR
-            if "COLOR" in obj.data.attributes:
-                obj.data.attributes.remove(obj.data.attributes["COLOR"])
-            
-            # 创建新的 COLOR
-            color_attr = obj.data.attributes.new(name="COLOR", domain='CORNER', type='BYTE_COLOR')
-            for i in range(len(color_attr.data)):
-                color_attr.data[i].color = color_to_apply
+            # 重建 COLOR
+            _fill_color_attribute(obj.data, "COLOR", color_to_apply)
 
             # 鸣潮特殊处理
             if props.is_ming_chao_selected:
-                if "COLOR1" in obj.data.attributes:
-                    obj.data.attributes.remove(obj.data.attributes["COLOR1"])
-                
-                color_attr1 = obj.data.attributes.new(name="COLOR1", domain='CORNER', type='BYTE_COLOR')
-                for i in range(len(color_attr1.data)):
-                    color_attr1.data[i].color = color_to_apply
+                _fill_color_attribute(obj.data, "COLOR1", color_to_apply)
                 operator_instance.report({'INFO'}, f"已应用鸣潮双层顶点色: {obj.name}")
             else:
                 if "COLOR1" in obj.data.attributes:
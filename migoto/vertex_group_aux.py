@@ -1,6 +1,9 @@
 import bpy
+import numpy as np
 from bpy.types import Operator, Panel
 
+from . import vertex_weights
+
 # -------------------------------------------------------------------
 # 核心逻辑类
 # -------------------------------------------------------------------
@@ -13,17 +16,8 @@ class XXMI_VG_Utils:
             return
         
         obj.update_from_editmode()
-        vgroup_used = {i: False for i, k in enumerate(obj.vertex_groups)}
-
-        for v in obj.data.vertices:
-            for g in v.groups:
-                if g.weight > 0.0:
-                    vgroup_used[g.group] = True
-
-        unused_indices = [i for i, used in vgroup_used.items() if not used]
-        
-        for i in sorted(unused_indices, reverse=True):
-            obj.vertex_groups.remove(obj.vertex_groups[i])
+        # 权重矩阵按列取最大值，一次判断所有组
+        vertex_weights.remove_unused_vertex_groups(obj)
 
     @staticmethod
     def merge_vertex_groups_by_prefix(obj):
@@ -31,6 +25,12 @@ class XXMI_VG_Utils:
         if obj.type != "MESH":
             return
 
+        # 合并前取一次各组的 (顶点, 权重)，按组名跟踪，避免每组都遍历顶点
+        weights = vertex_weights.extract_vertex_weights(obj)
+        group_members = weights.split_by_group()
+        columns = {vg.name: group_members[vg.index] for vg in obj.vertex_groups}
+        num_vertices = len(obj.data.vertices)
+
         base_names = set([vg.name.split(".")[0] for vg in obj.vertex_groups])
 
         for base_name in base_names:
@@ -46,23 +46,27 @@ class XXMI_VG_Utils:
             target_vg = obj.vertex_groups.new(name=new_vg_name)
             target_vg_index = target_vg.index
 
-            relevant_indices = [vg.index for vg in relevant_vgs]
-            
-            for v in obj.data.vertices:
-                total_weight = 0.0
-                for g in v.groups:
-                    if g.group in relevant_indices:
-                        total_weight += g.weight
-                
-                if total_weight > 0:
-                    target_vg.add([v.index], total_weight, 'REPLACE')
-
-            for vg in relevant_vgs:
-                obj.vertex_groups.remove(vg)
+            relevant_names = [vg.name for vg in relevant_vgs]
+            total_weight = np.bincount(
+                np.concatenate([columns[name][0] for name in relevant_names]),
+                weights=np.concatenate([columns[name][1] for name in relevant_names]),
+                minlength=num_vertices,
+            ).astype(np.float32)
+            vert_ids = np.flatnonzero(total_weight > 0)
+            vertex_weights.add_weights_bucketed(
+                target_vg, vert_ids, total_weight[vert_ids], 'REPLACE'
+            )
+            columns[target_vg.name] = (vert_ids, total_weight[vert_ids])
+
+            for name in relevant_names:
+                obj.vertex_groups.remove(obj.vertex_groups[name])
+                columns.pop(name, None)
 
             final_vg = obj.vertex_groups.get(new_vg_name)
             if final_vg:
+                members = columns.pop(final_vg.name)
                 final_vg.name = base_name
+                columns[final_vg.name] = members
 
         bpy.ops.object.vertex_group_sort()
 
@@ -0,0 +1,171 @@
+"""
+XXMI Tools CHN — 顶点组权重稀疏矩阵
+==========================================
+一次遍历 mesh.vertices[*].groups，得到 CSR 格式的权重矩阵
+(indptr, group_idx, weight)，供各顶点组工具做向量化的行/列归约。
+
+权重没有可靠且廉价的变更签名（计算数据哈希本身就要遍历全部顶点），
+因此不做跨调用缓存：每个工具在开始时提取一次，在本次调用内复用。
+"""
+
+import numpy as np
+
+
+# ============================================================
+# CSR 权重矩阵
+# ============================================================
+
+class VertexWeights:
+    """CSR 权重矩阵：第 v 行为 group_idx/weight[indptr[v]:indptr[v+1]]"""
+
+    def __init__(self, indptr, group_idx, weight, num_groups):
+        self.indptr = indptr
+        self.group_idx = group_idx
+        self.weight = weight
+        self.num_groups = num_groups
+        self._vertex_idx = None
+
+    @property
+    def num_vertices(self):
+        return len(self.indptr) - 1
+
+    @property
+    def vertex_idx(self):
+        """每个非零项所属的顶点（COO 行索引）"""
+        if self._vertex_idx is None:
+            self._vertex_idx = np.repeat(
+                np.arange(self.num_vertices, dtype=np.int32), np.diff(self.indptr)
+            )
+        return self._vertex_idx
+
+    def group_counts(self):
+        """每个顶点组包含的顶点数（含权重为 0 的分配）"""
+        return np.bincount(self.group_idx, minlength=self.num_groups)
+
+    def group_max_weights(self):
+        """每个顶点组的最大权重，空组为 0"""
+        result = np.zeros(self.num_groups, dtype=np.float32)
+        np.maximum.at(result, self.group_idx, self.weight)
+        return result
+
+    def columns_sum(self, group_indices):
+        """若干顶点组的权重逐顶点求和，返回长度为顶点数的稠密数组"""
+        mask = np.isin(self.group_idx, np.asarray(group_indices, dtype=np.int32))
+        return np.bincount(
+            self.vertex_idx[mask], weights=self.weight[mask],
+            minlength=self.num_vertices,
+        ).astype(np.float32)
+
+    def column(self, group_index):
+        """单个顶点组的稠密权重"""
+        return self.columns_sum([group_index])
+
+    def split_by_group(self):
+        """按顶点组拆分 (顶点索引, 权重)，一次排序得到所有组"""
+        order = np.argsort(self.group_idx, kind='stable')
+        bounds = np.searchsorted(
+            self.group_idx[order], np.arange(self.num_groups + 1)
+        )
+        vertex_idx = self.vertex_idx[order]
+        weight = self.weight[order]
+        return [
+            (vertex_idx[bounds[i]:bounds[i + 1]], weight[bounds[i]:bounds[i + 1]])
+            for i in range(self.num_groups)
+        ]
+
+
+def extract_vertex_weights(obj):
+    """单次遍历提取 obj 的 CSR 权重矩阵"""
+    if obj.mode == 'EDIT':
+        obj.update_from_editmode()
+    mesh = obj.data
+    counts = np.zeros(len(mesh.vertices), dtype=np.int64)
+    group_idx = []
+    weight = []
+    add_group = group_idx.append
+    add_weight = weight.append
+    for v in mesh.vertices:
+        groups = v.groups
+        counts[v.index] = len(groups)
+        for g in groups:
+            add_group(g.group)
+            add_weight(g.weight)
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return VertexWeights(
+        indptr,
+        np.asarray(group_idx, dtype=np.int32),
+        np.asarray(weight, dtype=np.float32),
+        len(obj.vertex_groups),
+    )
+
+
+# ============================================================
+# 写回与删除辅助
+# ============================================================
+
+def add_weights_bucketed(vgroup, vertex_ids, weights, mode='REPLACE'):
+    """按权重值分桶调用 VertexGroup.add，相同权重的顶点一次写入"""
+    vertex_ids = np.asarray(vertex_ids)
+    weights = np.asarray(weights, dtype=np.float32)
+    if len(vertex_ids) == 0:
+        return
+    values, inverse = np.unique(weights, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(values) + 1))
+    for i, value in enumerate(values):
+        ids = vertex_ids[order[bounds[i]:bounds[i + 1]]]
+        vgroup.add(ids.tolist(), float(value), mode)
+
+
+def remove_vertex_groups(obj, indices):
+    """按索引从大到小删除顶点组，返回删除数量"""
+    removed = 0
+    for i in sorted(set(int(i) for i in indices), reverse=True):
+        obj.vertex_groups.remove(obj.vertex_groups[i])
+        removed += 1
+    return removed
+
+
+def remove_unused_vertex_groups(obj, require_weight=True):
+    """
+    删除未使用的顶点组。
+    require_weight=True：没有任何顶点权重 > 0 的组视为未使用；
+    require_weight=False：没有任何顶点分配（包括权重为 0）的组视为未使用。
+    """
+    if obj.type != 'MESH' or not obj.vertex_groups:
+        return 0
+    weights = extract_vertex_weights(obj)
+    if require_weight:
+        used = weights.group_max_weights() > 0.0
+    else:
+        used = weights.group_counts() > 0
+    return remove_vertex_groups(obj, np.flatnonzero(~used))
+
+
+def reorder_vertex_groups(obj, names):
+    """
+    按 names 的顺序重建 obj 的全部顶点组，代替逐步调用 vertex_group_move。
+    先快照 CSR 权重，清空后按目标顺序新建并分桶写回权重；
+    锁定状态与激活组保持不变。需在物体模式下调用。返回是否发生了重排。
+    """
+    vgroups = obj.vertex_groups
+    if [vg.name for vg in vgroups] == list(names):
+        return False
+    if sorted(vg.name for vg in vgroups) != sorted(names):
+        raise ValueError("names 必须是现有顶点组名称的一个排列")
+
+    columns = extract_vertex_weights(obj).split_by_group()
+    snapshot = {vg.name: (vg.lock_weight, columns[vg.index]) for vg in vgroups}
+    active_name = vgroups.active.name if vgroups.active else None
+
+    vgroups.clear()
+    for name in names:
+        lock_weight, (vertex_ids, weights) = snapshot[name]
+        vg = vgroups.new(name=name)
+        add_weights_bucketed(vg, vertex_ids, weights, 'REPLACE')
+        vg.lock_weight = lock_weight
+
+    if active_name is not None:
+        vgroups.active_index = vgroups.find(active_name)
+    return True
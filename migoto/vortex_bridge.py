@@ -12,6 +12,7 @@ import bpy
 import csv
 import os
 import json
+import numpy as np
 from mathutils import Vector
 from bpy.props import (
     PointerProperty, StringProperty, FloatProperty,
@@ -20,6 +21,9 @@ from bpy.props import (
 from bpy.types import PropertyGroup, Operator, UIList
 from bpy_extras.io_utils import ImportHelper, ExportHelper
 
+from . import vertex_weights
+from .group_matching import match_centers
+
 
 # ============================================================
 # 工具函数
@@ -37,41 +41,38 @@ def _read_csv_multiencoding(filepath):
 
 def _get_vertex_group_centers(obj):
     """获取网格每个非空顶点组的加权质心（世界空间）。"""
-    centers = {}
     mesh = obj.data
     if not obj.vertex_groups or not mesh.vertices:
-        return centers
+        return {}
+
+    weights = vertex_weights.extract_vertex_weights(obj)
     matrix = obj.matrix_world
-    for vg in obj.vertex_groups:
-        ws = Vector((0, 0, 0))
-        tw = 0.0
-        for v in mesh.vertices:
-            for g in v.groups:
-                if g.group == vg.index and g.weight > 0.001:
-                    ws += matrix @ v.co * g.weight
-                    tw += g.weight
-                    break
-        if tw > 0:
-            centers[vg.name] = ws / tw
+    names = [vg.name for vg in obj.vertex_groups]
+
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co = co.reshape(-1, 3).astype(np.float64)
+
+    valid = weights.weight > 0.001
+    group_idx = weights.group_idx[valid]
+    w = weights.weight[valid].astype(np.float64)
+    rows = co[weights.vertex_idx[valid]]
+    total = np.bincount(group_idx, weights=w, minlength=len(names))
+    sums = np.stack([
+        np.bincount(group_idx, weights=w * rows[:, axis], minlength=len(names))
+        for axis in range(3)
+    ], axis=1)
+
+    # 加权平均与仿射变换可交换，先求局部质心再转世界空间
+    centers = {}
+    for gi in np.flatnonzero(total > 0):
+        centers[names[gi]] = matrix @ Vector(sums[gi] / total[gi])
     return centers
 
 
 def _match_by_centers(src_centers, tgt_centers, threshold=0.05):
-    """贪心匹配：src=FBX(名称源), tgt=3DM(被重命名) → {tgt_name: src_name}"""
-    matches, unmatched = {}, []
-    remaining = dict(src_centers)
-    for tgt_name, tgt_pos in tgt_centers.items():
-        best_name, best_dist = None, float('inf')
-        for src_name, src_pos in remaining.items():
-            d = (tgt_pos - src_pos).length
-            if d < best_dist:
-                best_dist, best_name = d, src_name
-        if best_dist <= threshold:
-            matches[tgt_name] = best_name
-            del remaining[best_name]
-        else:
-            unmatched.append((tgt_name, best_dist))
-    return matches, unmatched
+    """全局最优匹配：src=FBX(名称源), tgt=3DM(被重命名) → {tgt_name: src_name}"""
+    return match_centers(src_centers, tgt_centers, threshold)
 
 
 # ============================================================
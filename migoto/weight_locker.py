@@ -1,10 +1,51 @@
 import bpy
 import time
+import numpy as np
+
+from . import vertex_weights
 
 # =============================================================================
 # 全局数据
 # =============================================================================
-# 结构: { "ObjName": { vert_idx: { "GroupName": weight } } }
+class LockedWeights:
+    """
+    单个物体的锁定权重，以数组形式保存。
+    vertices: 已锁定的顶点索引（升序、唯一）
+    vert_idx / group_code / weight: 每条权重记录，group_code 指向 group_names
+    顶点组按名称记录，与顶点组的排列顺序无关。
+    """
+
+    def __init__(self):
+        self.vertices = np.zeros(0, dtype=np.int64)
+        self.group_names = []
+        self.vert_idx = np.zeros(0, dtype=np.int64)
+        self.group_code = np.zeros(0, dtype=np.int64)
+        self.weight = np.zeros(0, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def encode_groups(self, names):
+        """将顶点组名称列表映射为 group_names 中的编码，必要时追加新名称"""
+        lookup = {name: code for code, name in enumerate(self.group_names)}
+        codes = np.empty(len(names), dtype=np.int64)
+        for i, name in enumerate(names):
+            code = lookup.get(name)
+            if code is None:
+                code = lookup[name] = len(self.group_names)
+                self.group_names.append(name)
+            codes[i] = code
+        return codes
+
+    def update(self, vertices, vert_idx, group_code, weight):
+        """用新记录覆盖 vertices 中顶点的旧记录"""
+        keep = ~np.isin(self.vert_idx, vertices)
+        self.vertices = np.union1d(self.vertices, vertices)
+        self.vert_idx = np.concatenate([self.vert_idx[keep], vert_idx])
+        self.group_code = np.concatenate([self.group_code[keep], group_code])
+        self.weight = np.concatenate([self.weight[keep], weight])
+
+# 结构: { "ObjName": LockedWeights }
 XXMI_LOCK_DATA = {}       
 
 # 结构: { "ObjName": "LAST_MODE" }
@@ -16,9 +57,27 @@ XXMI_IS_BUSY = False
 # =============================================================================
 # 1. 批量还原逻辑 (核心)
 # =============================================================================
+def read_locked_weights(obj, lock):
+    """只读取已锁定顶点的当前权重，返回 (vert_idx, group_code, weight)"""
+    mesh = obj.data
+    codes = lock.encode_groups([vg.name for vg in obj.vertex_groups])
+    vert_idx, group_idx, weight = [], [], []
+    for v_idx in lock.vertices[lock.vertices < len(mesh.vertices)].tolist():
+        for g in mesh.vertices[v_idx].groups:
+            vert_idx.append(v_idx)
+            group_idx.append(g.group)
+            weight.append(g.weight)
+    group_idx = np.asarray(group_idx, dtype=np.int64)
+    return (
+        np.asarray(vert_idx, dtype=np.int64),
+        codes[group_idx] if len(codes) else group_idx,
+        np.asarray(weight, dtype=np.float32),
+    )
+
 def restore_weights_batch(obj_name):
     """
     针对单个物体执行批量还原。
+    只比较锁定顶点的当前权重与快照，仅改写发生变化的条目。
     """
     global XXMI_LOCK_DATA
     
@@ -27,29 +86,51 @@ def restore_weights_batch(obj_name):
     obj = bpy.data.objects.get(obj_name)
     if not obj or obj.type != 'MESH': return
 
-    locked_verts = XXMI_LOCK_DATA[obj_name]
-    if not locked_verts: return
+    lock = XXMI_LOCK_DATA[obj_name]
+    if not len(lock): return
 
     mesh = obj.data
-    vg_map = {vg.name: vg.index for vg in obj.vertex_groups}
-    all_indices = list(locked_verts.keys())
-    
-    print(f"[XXMI] 正在还原 '{obj_name}' 的 {len(all_indices)} 个顶点权重...")
-    
-    # --- A. 批量移除 (极速) ---
-    # 直接操作底层 C 结构，一次性移除
-    for vg in obj.vertex_groups:
-        vg.remove(all_indices)
-        
-    # --- B. 填回数据 ---
-    # 仅处理依然存在的顶点和组
-    for v_idx, saved_weights in locked_verts.items():
-        if v_idx >= len(mesh.vertices): continue
-            
-        for vg_name, w in saved_weights.items():
-            if vg_name in vg_map:
-                obj.vertex_groups[vg_map[vg_name]].add([v_idx], w, 'REPLACE')
-    
+    cur_v, cur_g, cur_w = read_locked_weights(obj, lock)
+
+    # (顶点, 组) 组合成单个键，便于集合比较
+    stride = len(lock.group_names) + 1
+    cur_key = cur_v * stride + cur_g
+    saved = lock.vert_idx < len(mesh.vertices)
+    saved_key = lock.vert_idx[saved] * stride + lock.group_code[saved]
+    saved_w = lock.weight[saved]
+
+    # --- A. 快照中不存在的分配：删除 ---
+    extra = ~np.isin(cur_key, saved_key)
+    # --- B. 缺失或权重被改动的分配：写回 ---
+    order = np.argsort(cur_key)
+    pos = np.clip(np.searchsorted(cur_key[order], saved_key), 0, max(len(cur_key) - 1, 0))
+    if len(cur_key):
+        found = cur_key[order][pos] == saved_key
+        unchanged = found & (cur_w[order][pos] == saved_w)
+    else:
+        unchanged = np.zeros(len(saved_key), dtype=bool)
+    changed = ~unchanged
+
+    if not extra.any() and not changed.any():
+        return
+
+    print(f"[XXMI] 正在还原 '{obj_name}' 的 {int(extra.sum() + changed.sum())} 条顶点权重...")
+
+    vg_map = {vg.name: vg for vg in obj.vertex_groups}
+    for code in np.unique(cur_g[extra]):
+        vg = vg_map.get(lock.group_names[code])
+        if vg:
+            vg.remove(cur_v[extra & (cur_g == code)].tolist())
+
+    changed_v = lock.vert_idx[saved][changed]
+    changed_g = lock.group_code[saved][changed]
+    changed_w = saved_w[changed]
+    for code in np.unique(changed_g):
+        vg = vg_map.get(lock.group_names[code])
+        if vg:
+            sel = changed_g == code
+            vertex_weights.add_weights_bucketed(vg, changed_v[sel], changed_w[sel], 'REPLACE')
+
     # 强制刷新
     mesh.update()
 
@@ -127,29 +208,28 @@ class XXMI_OT_LockSelection(bpy.types.Operator):
 
         # 2. 遍历每一个选中的物体
         for obj in targets:
-            if obj.name not in XXMI_LOCK_DATA:
-                XXMI_LOCK_DATA[obj.name] = {}
-                
             mesh = obj.data
-            vg_index_map = {vg.index: vg.name for vg in obj.vertex_groups}
-            
-            count_obj = 0
             
             # 扫描该物体的顶点
-            selected_verts = [v for v in mesh.vertices if v.select]
+            select = np.zeros(len(mesh.vertices), dtype=bool)
+            mesh.vertices.foreach_get("select", select)
+            selected_verts = np.flatnonzero(select)
+            count_obj = len(selected_verts)
             
-            if not selected_verts:
+            if not count_obj:
                 continue
-                
-            for v in selected_verts:
-                w_record = {}
-                for g in v.groups:
-                    if g.group in vg_index_map:
-                        vg_name = vg_index_map[g.group]
-                        w_record[vg_name] = g.weight
-                
-                XXMI_LOCK_DATA[obj.name][v.index] = w_record
-                count_obj += 1
+
+            # 从权重矩阵中取出选中顶点的全部记录
+            weights = vertex_weights.extract_vertex_weights(obj)
+            rows = select[weights.vertex_idx]
+            lock = XXMI_LOCK_DATA.setdefault(obj.name, LockedWeights())
+            codes = lock.encode_groups([vg.name for vg in obj.vertex_groups])
+            lock.update(
+                selected_verts,
+                weights.vertex_idx[rows].astype(np.int64),
+                codes[weights.group_idx[rows]],
+                weights.weight[rows],
+            )
             
             if count_obj > 0:
                 print(f"[XXMI] 已锁定 {count_obj} 个顶点 (物体: '{obj.name}')")
@@ -211,11 +291,10 @@ class XXMI_OT_SelectLocked(bpy.types.Operator):
         for obj in targets:
             obj.select_set(True)
             mesh = obj.data
-            for v in mesh.vertices: v.select = False
-            
-            for idx in XXMI_LOCK_DATA[obj.name]:
-                if idx < len(mesh.vertices):
-                    mesh.vertices[idx].select = True
+            vertices = XXMI_LOCK_DATA[obj.name].vertices
+            select = np.zeros(len(mesh.vertices), dtype=bool)
+            select[vertices[vertices < len(mesh.vertices)]] = True
+            mesh.vertices.foreach_set("select", select)
         
         # 将所有涉及的物体切入编辑模式 (多物体编辑)
         if targets:
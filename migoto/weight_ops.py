@@ -1,43 +1,77 @@
 import bpy
 import re
+import numpy as np
 from bpy.props import PointerProperty, StringProperty, EnumProperty, FloatProperty, BoolProperty
 from bpy.types import Object, Operator, PropertyGroup, Panel
 from mathutils import Vector
+from . import vertex_weights
+from .group_matching import match_centers
 
 # =============================================================================
 # 1. 核心算法
 # =============================================================================
 
+def get_weighted_centers(obj):
+    """
+    一次性计算 obj 所有顶点组的加权重心（世界坐标）。
+    权重 = 顶点组权重 × 顶点影响面积，返回按顶点组索引排列的列表，空组为 None。
+    """
+    mesh = obj.data
+    num_groups = len(obj.vertex_groups)
+    if num_groups == 0:
+        return []
+
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co = co.reshape(-1, 3).astype(np.float64)
+
+    weights = vertex_weights.extract_vertex_weights(obj)
+    w = weights.weight.astype(np.float64) * calculate_vertex_influence_area(obj)[weights.vertex_idx]
+    valid = w > 0
+    group_idx = weights.group_idx[valid]
+    w = w[valid]
+    rows = co[weights.vertex_idx[valid]]
+
+    total = np.bincount(group_idx, weights=w, minlength=num_groups)
+    sums = np.stack([
+        np.bincount(group_idx, weights=w * rows[:, axis], minlength=num_groups)
+        for axis in range(3)
+    ], axis=1)
+
+    # 仿射变换下加权平均与变换可交换，先求局部重心再转到世界坐标
+    matrix = obj.matrix_world
+    centers = []
+    for gi in range(num_groups):
+        if total[gi] > 0:
+            centers.append(matrix @ Vector(sums[gi] / total[gi]))
+        else:
+            centers.append(None)
+    return centers
+
 def get_weighted_center(obj, vgroup):
-    total_weight_area = 0.0
-    weighted_position_sum = Vector((0.0, 0.0, 0.0))
-    vertex_influence_area = calculate_vertex_influence_area(obj)
-    
-    for vertex in obj.data.vertices:
-        weight = get_vertex_group_weight(vgroup, vertex)
-        
-        influence_area = vertex_influence_area[vertex.index]
-        weight_area = weight * influence_area
-        
-        if weight_area > 0:
-            weighted_position_sum += obj.matrix_world @ vertex.co * weight_area
-            total_weight_area += weight_area
-            
-    return weighted_position_sum / total_weight_area if total_weight_area > 0 else None
+    return get_weighted_centers(obj)[vgroup.index]
 
 def calculate_vertex_influence_area(obj):
-    vertex_area = [0.0] * len(obj.data.vertices)
-    for face in obj.data.polygons:
-        area_per_vertex = face.area / len(face.vertices)
-        for vert_idx in face.vertices:
-            vertex_area[vert_idx] += area_per_vertex
-    return vertex_area
-
-def get_vertex_group_weight(vgroup, vertex):
-    for group in vertex.groups:
-        if group.group == vgroup.index:
-            return group.weight
-    return 0.0
+    """每个顶点平分其所在面的面积，返回长度为顶点数的数组"""
+    mesh = obj.data
+    num_polys = len(mesh.polygons)
+    if num_polys == 0:
+        return np.zeros(len(mesh.vertices), dtype=np.float64)
+
+    area = np.empty(num_polys, dtype=np.float32)
+    loop_start = np.empty(num_polys, dtype=np.int32)
+    loop_total = np.empty(num_polys, dtype=np.int32)
+    mesh.polygons.foreach_get("area", area)
+    mesh.polygons.foreach_get("loop_start", loop_start)
+    mesh.polygons.foreach_get("loop_total", loop_total)
+    loop_vert = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vert)
+
+    # 展开每个面的 loop 索引，不依赖 loop 在内存中的排列顺序
+    offsets = np.arange(loop_total.sum()) - np.repeat(np.cumsum(loop_total) - loop_total, loop_total)
+    loops = np.repeat(loop_start, loop_total) + offsets
+    area_per_vertex = np.repeat(area.astype(np.float64) / loop_total, loop_total)
+    return np.bincount(loop_vert[loops], weights=area_per_vertex, minlength=len(mesh.vertices))
 
 def match_vertex_groups(dest_obj, source_obj):
     # dest_obj = 接收权重的物体 (Base/Dest)
@@ -47,32 +81,39 @@ def match_vertex_groups(dest_obj, source_obj):
     for group in dest_obj.vertex_groups:
         group.name = "unknown"
     
-    # 2. 计算源物体的重心
-    source_centers = {group.name: get_weighted_center(source_obj, group) for group in source_obj.vertex_groups}
+    # 2. 一次性计算两侧所有顶点组的重心
+    source_centers = dict(zip((group.name for group in source_obj.vertex_groups), get_weighted_centers(source_obj)))
+    dest_centers = get_weighted_centers(dest_obj)
     
-    # 3. 匹配逻辑
-    for dest_group in dest_obj.vertex_groups:
-        dest_center = get_weighted_center(dest_obj, dest_group)
-        if dest_center:
-            # 寻找最近的源重心
-            best_match = min(source_centers.items(), key=lambda x: (dest_center - x[1]).length if x[1] else float('inf'), default=None)
-            if best_match:
-                dest_group.name = best_match[0]
+    # 3. 匹配逻辑：KD 树筛选候选 + 全局最优一一指派
+    source_centers = {name: center for name, center in source_centers.items() if center is not None}
+    dest_centers = {index: center for index, center in enumerate(dest_centers) if center is not None}
+    matches, unmatched = match_centers(source_centers, dest_centers)
+    for dest_index, source_name in matches.items():
+        dest_obj.vertex_groups[dest_index].name = source_name
+
+    # 4. 不在候选中或在一一指派中落选的组（如目标组多于源组）仍按最近的源重心命名
+    if unmatched and source_centers:
+        source_names = list(source_centers)
+        source_co = np.array([source_centers[name] for name in source_names])
+        unmatched_indices = [dest_index for dest_index, _ in unmatched]
+        dest_co = np.array([dest_centers[dest_index] for dest_index in unmatched_indices])
+        dist = np.linalg.norm(dest_co[:, None, :] - source_co[None, :, :], axis=2)
+        for dest_index, nearest in zip(unmatched_indices, np.argmin(dist, axis=1)):
+            dest_obj.vertex_groups[dest_index].name = source_names[nearest]
 
 def numeric_key(s):
     return [int(text) if text.isdigit() else text for text in re.split(r'(\d+)', s)]
 
 def sort_vertex_groups(obj):
     sorted_group_names = sorted([g.name for g in obj.vertex_groups], key=numeric_key)
-    for correct_idx, group_name in enumerate(sorted_group_names):
-        set_active_vertex_group(obj, group_name)
-        current_idx = obj.vertex_groups.find(group_name)
-        while current_idx < correct_idx:
-            bpy.ops.object.vertex_group_move(direction='DOWN')
-            current_idx += 1
-        while current_idx > correct_idx:
-            bpy.ops.object.vertex_group_move(direction='UP')
-            current_idx -= 1
+    # 编辑模式下权重保存在 BMesh 中，重建顶点组前需先回到物体模式
+    prev_mode = obj.mode
+    if prev_mode == 'EDIT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    vertex_weights.reorder_vertex_groups(obj, sorted_group_names)
+    if prev_mode == 'EDIT':
+        bpy.ops.object.mode_set(mode='EDIT')
 
 def set_active_vertex_group(obj, group_name):
     group_index = obj.vertex_groups.find(group_name)
@@ -132,7 +173,7 @@ class XXMI_OT_WeightMatch(Operator):
             match_vertex_groups(base_obj, target_obj)
             
             # 2. 【新增功能】自动按名称排序
-            # 必须将目标物体设为激活物体才能执行 vertex_group_move 操作
+            # 将目标物体设为激活物体，便于查看排序结果
             context.view_layer.objects.active = base_obj
             # 确保物体被选中（虽然通常是指针属性，但以防万一）
             base_obj.select_set(True)